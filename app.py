@@ -1,81 +1,184 @@
-import json
+import multiprocessing
+import os
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import streamlit as st
-import pandas as pd
-from utils import HandleTradeData
-from functions import map_agent_func_to_trade_data_handler
-from openai import OpenAI
-
-# ──────────────── Ollama-backed OpenAI client ────────────────
-client = OpenAI(base_url="http://localhost:11434/v1", api_key="ollama")
-MODEL = "dwightfoster03/functionary-small-v3.1:latest"          # tool-calling model
-
-# ───────────────────── helper utilities ──────────────────────
-def _to_openai_messages(history):
-    """Convert local chat dicts → OpenAI SDK format."""
-    formatted = []
-    for m in history:
-        role = m["role"]
-        base = {"role": role}
-
-        if role == "assistant" and "function_call" in m:
-            base |= {"content": None, "function_call": m["function_call"]}
-        elif role == "tool":
-            base |= {"name": m["name"], "tool_call_id": m["tool_call_id"], "content": m["content"]}
-        else:
-            base["content"] = m["content"]
+from backends import DEFAULT_PROFILE, PROFILES
+from warmup import ModelWarmup
+
+# Models per pass (see backends.PROFILES): "tiered" picks tools with functionary and explains with a
+# larger model; the default comes from PNL_MODEL_PROFILE and can be switched per session in the sidebar
+MODEL_PROFILE = DEFAULT_PROFILE
+
+# The model is loaded at startup and kept resident this long ("30m", "2h", -1 = until Ollama stops);
+# the keep-alive is re-sent periodically because chat requests reset it to the server default
+MODEL_KEEP_ALIVE = "30m"
+MODEL_KEEP_ALIVE_REFRESH_SECONDS = 240
+
+# Parsed trade logs shared by every session, keyed by the upload's content hash
+TRADE_CACHE_MAX_ENTRIES = 8
+TRADE_CACHE_MAX_BYTES = 2 * 1024**3
+
+# Uploads above this size are ingested in chunks into running aggregates only; larger uploads are
+# accepted because .streamlit/config.toml raises server.maxUploadSize from 200 MB to 1024 MB
+STREAMING_THRESHOLD_BYTES = 200 * 1024**2
+STREAMING_CHUNK_ROWS = 100_000
+
+# Cleaned trade logs persisted across restarts (Arrow IPC; reloaded without re-parsing the CSV)
+SNAPSHOT_DIR = ".snapshots"
+SNAPSHOT_MAX_BYTES = 5 * 1024**3
+
+# Model answers reused for identical questions on identical data
+LLM_CACHE_MAX_ENTRIES = 512
+LLM_CACHE_TTL_SECONDS = 3600
+LLM_CACHE_DIR = ".llm_cache"          # None keeps the cache in memory only
+LLM_CACHE_MAX_BYTES = 256 * 1024**2   # disk tier; expired and oldest answers are pruned on startup
+
+# Default number of model passes per question (see pipeline.ANSWER_MODES)
+ANSWER_MODE = "template"
+STREAM_ANSWERS = True                 # render tokens as they arrive
+
+# Prompt tokens each model call may use; older turns are compacted / dropped to fit
+CONTEXT_TOKEN_BUDGET = 3000
+
+# Tool calls of one model turn run concurrently; each may take at most this long
+TOOL_WORKERS = 4
+TOOL_TIMEOUT_SECONDS = 30
+
+# Answer clear-cut questions ("what did I make on TSLA") by rules, skipping the tool-selection pass
+ROUTE_QUESTIONS = True
+
+# How tool results are written into the prompt (see serialize.RESULT_FORMATS)
+TOOL_RESULT_FORMAT = "csv"
+TOOL_RESULT_MAX_ROWS = 20
+TOOL_RESULT_MAX_CHARS = 4000
+
+# Timing spans (ingestion stages, model calls, tools) appended as JSON lines; None keeps them in memory only
+PERF_LOG_PATH = ".perf/spans.jsonl"
+PERF_WINDOW = 500                     # spans used for the rolling percentiles
+
+
+@st.cache_resource
+def model_warmup():
+    """Started once per process: preloads the model and imports the heavy modules in the background."""
+    return ModelWarmup(
+        models=PROFILES[MODEL_PROFILE].models, keep_alive=MODEL_KEEP_ALIVE, refresh=MODEL_KEEP_ALIVE_REFRESH_SECONDS
+    ).start()
+
+
+@st.cache_resource
+def trade_data_cache():
+    """Process-wide LRU of HandleTradeData objects (survives reruns and sessions)."""
+    return LRUCache(
+        max_entries=TRADE_CACHE_MAX_ENTRIES,
+        max_bytes=TRADE_CACHE_MAX_BYTES,
+        sizeof=lambda dh: dh.memory_usage(),
+    )
 
-        formatted.append(base)
-    return formatted
 
+@st.cache_resource
+def ingest_pool():
+    """Process-wide pool for parsing several account CSVs in parallel."""
+    # spawn, not fork: forking the multi-threaded Streamlit server is unsafe
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
 
-def make_tool_schema(fn_defs):
-    """Wrap our function definitions in the new `tools` schema."""
-    return [
-        {"type": "function", "function": {k: v for k, v in f.items() if k != "callback"}}
-        for f in fn_defs
-    ]
 
+@st.cache_resource
+def tool_pool():
+    """Process-wide thread pool shared by every session's tool calls."""
+    return ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+@st.cache_resource
+def perf_tracer():
+    """The process-wide tracer, pointed at PERF_LOG_PATH once per process."""
+    tracer.configure(path=PERF_LOG_PATH)
+    return tracer
+
+
+@st.cache_resource
+def response_cache():
+    """Process-wide cache of model responses (memory LRU + optional disk tier, pruned on startup)."""
+    cache = ResponseCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL_SECONDS, directory=LLM_CACHE_DIR,
+                          max_bytes=LLM_CACHE_MAX_BYTES)
+    cache.cleanup()
+    return cache
+
+
+@st.cache_resource
+def snapshot_store():
+    """Process-wide snapshot store; stale or oversized snapshots are pruned on startup."""
+    store = SnapshotStore(SNAPSHOT_DIR, max_bytes=SNAPSHOT_MAX_BYTES)
+    store.cleanup()
+    return store
 
-def call_llm(history, tools=None):
-    """Send chat history to the model and return the next message."""
-    messages = _to_openai_messages(history)
-    resp = client.chat.completions.create(
-        model=MODEL,
-        messages=messages,
-        tools=tools,
-        tool_choice="auto",
-        response_format={"type": "json_object"},
-    )
-    msg = resp.choices[0].message
-    print("Model response content: " + str(msg.content))
-
-    out = {"role": msg.role, "content": msg.content}
-    if msg.tool_calls:
-        out["tool_calls"] = [
-            {"id": c.id, "name": c.function.name, "arguments": c.function.arguments}
-            for c in msg.tool_calls
-        ]
-    elif msg.function_call:  # legacy fallback
-        out["function_call"] = {
-            "name": msg.function_call.name,
-            "arguments": msg.function_call.arguments,
-        }
-    return out
 
 # ───────────────────────── Streamlit UI ───────────────────────
 st.set_page_config(page_title="PnL Chat Agent", layout="wide")
 st.title("📊 Agentic AI – Profit & Loss Analyzer")
+warm = model_warmup()   # runs while the user is still choosing files
 
-upload = st.file_uploader("Upload trade CSV", ["csv"])
-if not upload:
+uploads = st.file_uploader("Upload trade CSVs (one per account)", ["csv"], accept_multiple_files=True)
+st.sidebar.caption(warm.status())
+if not uploads:
     st.stop()
 
-dh = HandleTradeData(upload)
-function_defs = map_agent_func_to_trade_data_handler(dh)
-tools_schema = make_tool_schema(function_defs)
+# Heavy modules (pandas, the OpenAI SDK) load only once there is data; the warm-up has usually imported them already
+import pandas as pd
+from cache import LRUCache, ResponseCache
+from snapshot import SnapshotStore
+from utils import Portfolio, append_trade_data, load_accounts
+from functions import ToolRegistry
+from executor import ToolExecutor
+from pipeline import ANSWER_MODES, SYSTEM_PROMPT, answer_question
+from router import IntentRouter, new_router_stats, router_summary
+from serialize import serialize_result
+from perf import span, tracer
+
+with perf_tracer().trace(), span("ingest.accounts", files=len(uploads)):
+    dh = load_accounts(
+        uploads,
+        trade_data_cache(),
+        executor=ingest_pool(),
+        snapshots=snapshot_store(),
+        chunksize=STREAMING_CHUNK_ROWS,
+        streaming_threshold=STREAMING_THRESHOLD_BYTES,
+    )
+
+# Daily activity files layered on top of one account's history; only their new rows are processed
+deltas = st.file_uploader("Append new activity (optional)", ["csv"], accept_multiple_files=True)
+if deltas:
+    target = st.selectbox("Append to account", list(dh.accounts))
+    accounts = dict(dh.accounts)
+    for delta in deltas:
+        try:
+            accounts[target] = append_trade_data(accounts[target], delta, trade_data_cache())
+        except ValueError as err:
+            st.warning(f"{delta.name}: {err}")
+    dh = Portfolio(accounts)
+# Tools bound to this session's data only; the schema is shared and built once per process
+function_defs = ToolRegistry(dh)
+tools_schema = function_defs.tools_schema
+tool_executor = ToolExecutor(function_defs, pool=tool_pool(), timeout=TOOL_TIMEOUT_SECONDS)
+router_stats = st.session_state.setdefault("router_stats", new_router_stats())
+
+model_profile = st.sidebar.selectbox("Model profile", list(PROFILES), index=list(PROFILES).index(MODEL_PROFILE))
+stream_tokens = st.sidebar.checkbox("Stream answers", value=STREAM_ANSWERS)
+answer_mode = st.sidebar.selectbox("Answer mode", ANSWER_MODES, index=ANSWER_MODES.index(ANSWER_MODE))
+llm_cache = None if st.sidebar.checkbox("Bypass LLM response cache") else response_cache()
+use_router = st.sidebar.checkbox("Route clear-cut questions without the model", value=ROUTE_QUESTIONS)
+if router_stats["questions"]:
+    st.sidebar.caption("Router: {hit_rate:.0%} of {questions} questions routed, {mean_ms:.2f} ms avg".format(**router_summary(router_stats)))
+if llm_cache is not None:
+    st.sidebar.caption("LLM cache: {hits} hits / {misses} misses ({disk_hits} from disk)".format(**llm_cache.stats()))
 
 with st.expander("Full trade log"):
-    st.dataframe(dh.df, use_container_width=True)
+    for name, tab in zip(dh.accounts, st.tabs(list(dh.accounts))):
+        account_df = dh.accounts[name].df
+        if account_df is not None:
+            tab.dataframe(account_df, use_container_width=True)
+        else:
+            tab.caption("Ingested in streaming mode; only aggregates are kept.")
 # with st.expander("Profit & Loss summary"):
 #     st.dataframe(dh.pnl_df, use_container_width=True)
 
@@ -83,14 +186,7 @@ display_chat = st.session_state.setdefault("display_chat", [])
 chat = st.session_state.setdefault(
     "chat",
     [
-        {
-            "role": "system",
-            "content": (
-                "You are a finance assistant. "
-                "If you need calculations, call one of the available functions."
-            ),
-            "display": False,
-        }
+        {"role": "system", "content": SYSTEM_PROMPT, "display": False}
     ],
 )
 
@@ -101,108 +197,67 @@ for m in display_chat:
 if question := st.chat_input("Ask about your trades"):
     # ── user question
     display_chat.append({"role": "user", "content": question})
-    chat.append({"role": "user", "content": question})
     st.chat_message("user").markdown(question)
 
-    # ── first model pass
-    assistant = call_llm(chat, tools=tools_schema)
-    if assistant.get("content") and not assistant.get("tool_calls"):
-        assistant["display"] = False
-        chat.append(assistant)
-
-    # ── new spec: tool_calls array
-    if "tool_calls" in assistant:
-        print("Tool calls detected: " + str(assistant["tool_calls"]))
-        for call in assistant["tool_calls"]:
-            fn_name = call["name"]
-            args = json.loads(call["arguments"] or "{}")
-
-            fn_entry = next(f for f in function_defs if f["name"] == fn_name)
-            result = fn_entry["callback"](**args) if args else fn_entry["callback"]()
-
-            result_md = (
-                result.to_markdown(index=False)
-                if isinstance(result, pd.DataFrame)
-                else str(result)
-            )
-
-            chat.append(
-                {
-                    "role": "tool",
-                    "name": fn_name,
-                    "tool_call_id": call["id"],
-                    "content": result_md,
-                    "display": False,
-                }
-            )
-
-        # second pass for final answer
-        assistant = call_llm(chat)
-        assistant["display"] = False
-        chat.append(assistant)
-
-    # ── legacy 0613 function_call support
-    elif "function_call" in assistant:
-        fn_name = assistant["function_call"]["name"]
-        args = json.loads(assistant["function_call"]["arguments"] or "{}")
-
-        fn_entry = next(f for f in function_defs if f["name"] == fn_name)
-        result = fn_entry["callback"](dh.df, **args) if args else fn_entry["callback"](dh.df)
-
-        result_md = (
-            result.to_markdown(index=False)
-            if isinstance(result, pd.DataFrame)
-            else str(result)
+    with st.chat_message("assistant"):
+        bubble = st.empty()
+        answer, stats = answer_question(
+            question,
+            chat,
+            function_defs,
+            tools_schema,
+            mode=answer_mode,
+            context_budget=CONTEXT_TOKEN_BUDGET,
+            executor=tool_executor,
+            router=IntentRouter.for_handler(dh, stats=router_stats) if use_router else None,
+            serialize=partial(
+                serialize_result,
+                fmt=TOOL_RESULT_FORMAT,
+                max_rows=TOOL_RESULT_MAX_ROWS,
+                max_chars=TOOL_RESULT_MAX_CHARS,
+            ),
+            on_text=(lambda text: bubble.markdown(text + " ▌")) if stream_tokens else None,
+            cache=llm_cache,
+            data_hash=dh.content_hash,
+            backends=PROFILES[model_profile],
         )
-
-        chat.append(
-            {"role": "function", "name": fn_name, "content": result_md, "display": False}
+        bubble.markdown(answer)
+    warm.answered()
+    display_chat.append({"role": "assistant", "content": answer})
+    caption = f"{stats['model_calls']} model call(s) · {stats['tool_calls']} tool call(s) · {stats['mode']} mode"
+    if stats["routed"]:
+        caption += " · routed without the model"
+    if stats.get("first_token_s") is not None:
+        caption += f" · first token after {stats['first_token_s']:.2f}s"
+    if stats["results"]:
+        caption += " · tool results {} bytes".format(sum(r["bytes"] for r in stats["results"]))
+    if stats["prompts"]:
+        caption += " · prompt ≤{} tokens (budget {})".format(
+            max(p["tokens_out"] for p in stats["prompts"]), CONTEXT_TOKEN_BUDGET
         )
-
-        # final answer
-        assistant = call_llm(chat)
-        assistant["display"] = False
-        chat.append(assistant)
-
-    if assistant["content"]:
-        assistant["display"] = True
-
-    # 1️⃣ Extract model tool result
-    try:
-        content_data = json.loads(assistant["content"])
-        if isinstance(content_data, dict) and content_data:
-            if content_data.get("value"):
-                value = content_data["value"]
-                if isinstance(value, list):
-                    value = "\n".join([str(item) for item in value])
-            else:
-                value = next(iter(content_data.values()))
-        else:
-            value = assistant["content"]
-    except json.JSONDecodeError:
-        value = assistant["content"]
-
-    # 2️⃣ Combine question and tool output → LLM for natural explanation
-    refinement_prompt = (
-        f"The user asked: '{question}'\n"
-        f"The computed result was:\n{value}\n\n"
-        f"Please explain the result clearly and helpfully."
-    )
-    chat.append({"role": "user", "content": refinement_prompt})
-    refined_response = call_llm(chat)
-    chat.append(refined_response)
-
-    # 3️⃣ Display refined final answer
-    final_msg = json.loads(refined_response["content"])
-    print("Final message content: " + str(list(final_msg.values())))
-    if (len(final_msg) > 1):
-        final_msg = list(final_msg.values())[1]
-    else:
-        final_msg = list(final_msg.values())[0]
-    if isinstance(final_msg, list):
-        final_msg = "\n".join([str(item) for item in final_msg])
-    display_chat.append({"role": "assistant", "content": final_msg})
-    st.chat_message("assistant").markdown(final_msg)
-
-
-
+    st.caption(caption)
+    st.session_state["last_trace"] = stats["trace"]
+
+# ───────────────────── performance panel ─────────────────────
+if st.sidebar.checkbox("Show performance panel"):
+    with st.sidebar.expander("Performance", expanded=True):
+        last = perf_tracer().for_trace(st.session_state.get("last_trace"))
+        if last:
+            st.markdown("**Last question**")
+            st.dataframe(
+                pd.DataFrame(
+                    [{"span": r["span"], "ms": 1000 * r["seconds"], "model": r.get("model"), "tokens": r.get("prompt_tokens")} for r in last]
+                ),
+                hide_index=True,
+            )
+        if warm.timings:
+            st.markdown("**Startup (s)**")
+            st.dataframe(pd.Series(warm.timings, name="seconds").round(2))
+        percentiles = perf_tracer().percentiles(window=PERF_WINDOW)
+        if percentiles:
+            st.markdown(f"**Rolling percentiles (last {PERF_WINDOW} spans, ms)**")
+            st.dataframe(
+                pd.DataFrame(percentiles).T.assign(
+                    p50=lambda f: 1000 * f.p50, p90=lambda f: 1000 * f.p90, p99=lambda f: 1000 * f.p99
+                ).round(2)
+            )
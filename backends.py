@@ -0,0 +1,163 @@
+"""Model backends: one adapter per way of talking to a model, and per-pass model tiers.
+
+Every backend takes OpenAI-format messages plus the tools schema
+(functions.TOOLS_SCHEMA) and returns the same message dict
+({"role", "content", "tool_calls" | "function_call"}), so llm.call_llm and
+the pipeline do not care which model or protocol is behind a pass.
+"""
+import json
+import os
+from types import SimpleNamespace
+
+FUNCTIONARY = "dwightfoster03/functionary-small-v3.1:latest"
+
+
+def _json_arguments(arguments):
+    # Ollama's native API returns arguments as an object; everything downstream expects a JSON string
+    return arguments if isinstance(arguments, str) else json.dumps(arguments or {})
+
+
+class ToolsBackend:
+    """OpenAI-compatible /v1 chat completions with `tools` (functionary and other tool-tuned models)."""
+
+    style = "tools"
+    streams = True
+
+    def __init__(self, model, json_mode=True):
+        self.model = model
+        self.json_mode = json_mode
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.model!r})"
+
+    def request(self, messages, tools):
+        """Keyword arguments for llm_client's complete / stream."""
+        args = dict(model=self.model, messages=messages)
+        if tools:
+            args |= {"tools": tools, "tool_choice": "auto"}
+        if self.json_mode:
+            args["response_format"] = {"type": "json_object"}
+        return args
+
+    def complete(self, messages, tools):
+        """(message_dict, usage) for one non-streaming request; usage has prompt/completion_tokens or is None."""
+        from llm_client import shared_client
+
+        resp = shared_client().complete(**self.request(messages, tools))
+        msg = resp.choices[0].message
+        out = {"role": msg.role, "content": msg.content}
+        if msg.tool_calls:
+            out["tool_calls"] = [
+                {"id": c.id, "name": c.function.name, "arguments": c.function.arguments}
+                for c in msg.tool_calls
+            ]
+        elif msg.function_call:  # legacy fallback
+            out["function_call"] = {"name": msg.function_call.name, "arguments": msg.function_call.arguments}
+        return out, resp.usage
+
+    def stream(self, messages, tools):
+        """Iterator of chat.completion chunks."""
+        from llm_client import shared_client
+
+        return shared_client().stream(**self.request(messages, tools), stream_options={"include_usage": True})
+
+
+class FunctionsBackend(ToolsBackend):
+    """OpenAI-compatible /v1 with the legacy 0613 `functions` schema (models without tool support, e.g. gemma3)."""
+
+    style = "functions"
+
+    def request(self, messages, tools):
+        messages = [
+            {"role": "function", "name": m["name"], "content": m["content"]} if m["role"] == "tool" else m
+            for m in messages
+        ]
+        args = dict(model=self.model, messages=messages)
+        if tools:
+            args |= {"functions": [t["function"] for t in tools], "function_call": "auto"}
+        if self.json_mode:
+            args["response_format"] = {"type": "json_object"}
+        return args
+
+
+class OllamaBackend:
+    """Ollama's native /api/chat (e.g. mistral). Not streamed: the answer arrives in one piece."""
+
+    style = "native"
+    streams = False
+
+    def __init__(self, model, json_mode=True):
+        self.model = model
+        self.json_mode = json_mode
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.model!r})"
+
+    def request(self, messages, tools):
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "tool", "content": m["content"]} if m["role"] in ("tool", "function")
+                else m | {"content": m.get("content") or ""}
+                for m in messages
+            ],
+            "stream": False,
+        }
+        if tools:
+            payload["tools"] = tools
+        if self.json_mode:
+            payload["format"] = "json"
+        return payload
+
+    def complete(self, messages, tools):
+        from llm_client import shared_client
+
+        reply = shared_client().native("/api/chat", self.request(messages, tools))
+        msg = reply["message"]
+        out = {"role": msg.get("role", "assistant"), "content": msg.get("content") or None}
+        if msg.get("tool_calls"):
+            out["tool_calls"] = [
+                {"id": c.get("id"), "name": c["function"]["name"], "arguments": _json_arguments(c["function"].get("arguments"))}
+                for c in msg["tool_calls"]
+            ]
+        usage = None
+        if "prompt_eval_count" in reply:
+            usage = SimpleNamespace(prompt_tokens=reply["prompt_eval_count"], completion_tokens=reply.get("eval_count", 0))
+        return out, usage
+
+
+class ModelTiers:
+    """Which backend serves each model pass.
+
+    Passes that get the tool schema (tool selection) go to `select`; passes
+    without it (free-form explanation of tool results) go to `explain`, so
+    a small tool-calling model can pick tools while a larger one writes
+    the prose. `explain` defaults to `select`.
+    """
+
+    def __init__(self, select, explain=None):
+        self.select = select
+        self.explain = explain or select
+
+    def __repr__(self):
+        return f"ModelTiers(select={self.select!r}, explain={self.explain!r})"
+
+    def for_request(self, tools):
+        return self.select if tools else self.explain
+
+    @property
+    def models(self):
+        return list(dict.fromkeys([self.select.model, self.explain.model]))
+
+
+# Prose model of the "tiered" profile: mistral-nemo (12B) is larger than functionary-small (8B)
+EXPLAIN_MODEL = os.environ.get("OLLAMA_EXPLAIN_MODEL", "mistral-nemo")
+
+# Named configurations; app.py picks one per session (default from PNL_MODEL_PROFILE)
+PROFILES = {
+    "functionary": ModelTiers(ToolsBackend(FUNCTIONARY)),
+    "tiered": ModelTiers(ToolsBackend(FUNCTIONARY), ToolsBackend(EXPLAIN_MODEL)),
+    "gemma": ModelTiers(FunctionsBackend("gemma3:latest")),
+    "mistral": ModelTiers(OllamaBackend("mistral")),
+}
+DEFAULT_PROFILE = os.environ.get("PNL_MODEL_PROFILE", "functionary")
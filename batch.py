@@ -0,0 +1,173 @@
+"""Headless batch runner: answer a list of questions for every trade CSV in a directory.
+
+    python batch.py accounts/ -q "What is my ACH total?" -q "Give me risk advice" -o report.json
+    python batch.py accounts/ --questions nightly.txt --format csv -o answers.csv
+
+Accounts are loaded and answered concurrently (--workers); model calls
+across all accounts share one pooled client limited to --concurrency
+requests in flight. Throughput and per-account latency go to stderr and
+into the JSON report.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ResponseCache, content_hash
+from executor import ToolExecutor
+from functions import ToolRegistry
+from llm_client import MAX_CONCURRENCY, shared_client
+from pipeline import ANSWER_MODES, SYSTEM_PROMPT, answer_question
+from router import IntentRouter, new_router_stats, router_summary
+from snapshot import SnapshotStore
+from utils import HandleTradeData
+
+RESULT_FIELDS = ["account", "question", "answer", "error", "mode", "model_calls", "tool_calls", "routed", "seconds"]
+
+
+def run_account(path, questions, mode="template", tool_pool=None, router_stats=None, cache=None, snapshots=None):
+    """Answer every question for one trade CSV. Returns (result_rows, account_summary)."""
+    name = os.path.basename(path)
+    started = time.perf_counter()
+    try:
+        key = content_hash(path)
+        dh = HandleTradeData(path, content_hash=key, snapshots=snapshots)
+    except Exception as exc:   # one unreadable file must not sink the nightly run
+        error = f"{type(exc).__name__}: {exc}"
+        rows = [dict.fromkeys(RESULT_FIELDS) | {"account": name, "question": q, "error": error} for q in questions]
+        return rows, {"account": name, "error": error, "questions": len(questions)}
+    load_s = time.perf_counter() - started
+
+    tools = ToolRegistry(dh)
+    executor = ToolExecutor(tools, pool=tool_pool)
+    router = IntentRouter.for_handler(dh, stats=router_stats) if router_stats is not None else None
+    rows = []
+    for question in questions:
+        q_started = time.perf_counter()
+        chat = [{"role": "system", "content": SYSTEM_PROMPT}]   # questions are answered independently
+        row = {"account": name, "question": question, "answer": None, "error": None, "mode": mode}
+        try:
+            answer, stats = answer_question(
+                question, chat, tools, tools.tools_schema, mode=mode,
+                executor=executor, router=router, cache=cache, data_hash=key,
+            )
+            row |= {"answer": answer, "model_calls": stats["model_calls"],
+                    "tool_calls": stats["tool_calls"], "routed": stats["routed"]}
+        except Exception as exc:
+            row["error"] = f"{type(exc).__name__}: {exc}"
+        row["seconds"] = time.perf_counter() - q_started
+        rows.append(row)
+
+    latencies = [r["seconds"] for r in rows]
+    return rows, {
+        "account": name,
+        "rows": len(dh.df) if dh.df is not None else None,
+        "questions": len(questions),
+        "errors": sum(r["error"] is not None for r in rows),
+        "load_s": load_s,
+        "total_s": time.perf_counter() - started,
+        "mean_question_s": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max_question_s": max(latencies, default=0.0),
+    }
+
+
+def run_batch(paths, questions, mode="template", workers=4, concurrency=MAX_CONCURRENCY,
+              use_router=True, cache=None, snapshots=None):
+    """Run every question for every CSV in `paths`; returns the report dict."""
+    shared_client(max_concurrency=concurrency)   # first use fixes the process-wide model concurrency
+    router_stats = new_router_stats() if use_router else None
+    started = time.perf_counter()
+    results, accounts = [], []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="account") as account_pool, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tool") as tool_pool:
+        futures = [
+            account_pool.submit(run_account, path, questions, mode, tool_pool, router_stats, cache, snapshots)
+            for path in paths
+        ]
+        for future in futures:   # submission order keeps the report stable
+            rows, summary = future.result()
+            results += rows
+            accounts.append(summary)
+            print(f"{summary['account']}: {summary.get('total_s', 0):.2f}s"
+                  + (f" ERROR {summary['error']}" if summary.get("error") else ""), file=sys.stderr)
+    wall = time.perf_counter() - started
+
+    answered = [r for r in results if r["error"] is None]
+    return {
+        "summary": {
+            "accounts": len(paths),
+            "questions": len(results),
+            "answered": len(answered),
+            "errors": len(results) - len(answered),
+            "model_calls": sum(r["model_calls"] or 0 for r in results),
+            "wall_s": wall,
+            "questions_per_s": len(results) / wall if wall else 0.0,
+            "mode": mode,
+            "workers": workers,
+            "concurrency": concurrency,
+            "router": router_summary(router_stats) if router_stats is not None else None,
+        },
+        "accounts": accounts,
+        "results": results,
+    }
+
+
+def write_report(report, output=None, fmt="json"):
+    out = open(output, "w", newline="", encoding="utf-8") if output else sys.stdout
+    try:
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(report["results"])
+        else:
+            json.dump(report, out, indent=2, default=str)
+            out.write("\n")
+    finally:
+        if output:
+            out.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="directory of trade CSVs (one account per file)")
+    parser.add_argument("-q", "--question", action="append", default=[], help="question to ask (repeatable)")
+    parser.add_argument("--questions", help="file with one question per line")
+    parser.add_argument("--mode", choices=ANSWER_MODES, default="template")
+    parser.add_argument("--workers", type=int, default=4, help="accounts processed at once")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="model requests in flight")
+    parser.add_argument("--no-router", action="store_true", help="always ask the model to pick tools")
+    parser.add_argument("--cache-dir", help="reuse model answers across runs (ResponseCache disk tier)")
+    parser.add_argument("--snapshots", help="Arrow snapshot directory for parsed trade logs")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("-o", "--output", help="report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    questions = list(args.question)
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as fh:
+            questions += [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+    if not questions:
+        parser.error("no questions given (use -q or --questions)")
+    paths = sorted(glob.glob(os.path.join(args.directory, "*.csv")))
+    if not paths:
+        parser.error(f"no CSV files in {args.directory}")
+
+    report = run_batch(
+        paths, questions, mode=args.mode, workers=args.workers, concurrency=args.concurrency,
+        use_router=not args.no_router,
+        cache=ResponseCache(directory=args.cache_dir) if args.cache_dir else None,
+        snapshots=SnapshotStore(args.snapshots) if args.snapshots else None,
+    )
+    write_report(report, args.output, args.format)
+    s = report["summary"]
+    print(f"{s['questions']} questions over {s['accounts']} accounts in {s['wall_s']:.2f}s "
+          f"({s['questions_per_s']:.2f} q/s, {s['model_calls']} model calls, {s['errors']} errors)", file=sys.stderr)
+    return 1 if s["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Benchmarks for the trade-log pipeline on seeded synthetic broker CSVs.
+
+    python benchmark.py --rows 1000 100000 1000000 --output bench.json
+    python benchmark.py --rows 100000 --compare bench.json
+
+Each stage of HandleTradeData (and each tool callback) is timed, then run
+once more under tracemalloc for its peak Python/NumPy allocation. Results
+are JSON so runs from different commits can be compared with --compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from functions import ToolRegistry
+from utils import HandleTradeData, TradeSummary, apply_schema
+
+# Bump when the generated data changes so cached CSVs are rebuilt
+GENERATOR_VERSION = 1
+COLUMNS = ["Activity Date", "Process Date", "Settle Date", "Instrument", "Description",
+           "Trans Code", "Quantity", "Price", "Amount"]
+TICKERS = ["SPY", "QQQ", "TSLA", "AAPL", "NVDA", "AMD", "META", "AMZN", "MSFT", "GOOGL",
+           "IWM", "NFLX", "COIN", "PLTR", "BA", "DIS", "JPM", "XOM", "SOFI", "UBER"]
+CODES = np.array(["BTO", "STC", "OEXP", "ACH"])
+CODE_WEIGHTS = [0.45, 0.40, 0.10, 0.05]
+START_DATE = np.datetime64("2023-01-03")
+SPAN_DAYS = 730
+CHUNK_ROWS = 250_000
+
+
+# ───────────────────── synthetic trade logs ─────────────────────
+def _dates(days):
+    d = pd.DatetimeIndex(START_DATE + days.astype("timedelta64[D]"))
+    return [f"{m}/{dd}/{y}" for m, dd, y in zip(d.month, d.day, d.year)]
+
+
+def _money(values, negative):
+    return [f"(${v:,.2f})" if neg else f"${v:,.2f}" for v, neg in zip(values, negative)]
+
+
+def _chunk(rng, start, n, total, tickers):
+    codes = CODES[rng.choice(len(CODES), size=n, p=CODE_WEIGHTS)]
+    # Dates advance through the file like a real activity export
+    day = (np.arange(start, start + n) * SPAN_DAYS // max(total, 1)).astype(np.int64)
+    weights = 1.0 / np.arange(1, len(tickers) + 1)      # a few symbols dominate
+    root = rng.choice(len(tickers), size=n, p=weights / weights.sum())
+    expiry = day + rng.integers(0, 45, size=n)
+    expiry += (4 - (expiry + 1) % 7) % 7                 # snap to a Friday (START_DATE is a Tuesday)
+    strike = 5 * rng.integers(10, 120, size=n)
+    kind = rng.integers(0, 2, size=n)
+
+    # Expirations refer to contracts bought earlier in the same chunk
+    oexp = np.flatnonzero(codes == "OEXP")
+    bto = np.flatnonzero(codes == "BTO")
+    if len(oexp) and len(bto):
+        src = bto[rng.integers(0, len(bto), size=len(oexp))]
+        root[oexp], expiry[oexp], strike[oexp], kind[oexp] = root[src], expiry[src], strike[src], kind[src]
+
+    ach = codes == "ACH"
+    qty = rng.integers(1, 10, size=n)
+    price = np.round(rng.gamma(2.0, 1.5, size=n) + 0.01, 2)
+    amount = np.round(qty * price * 100, 2)
+    amount[ach] = np.round(rng.uniform(100, 5000, size=ach.sum()), 2)
+
+    names = np.array(tickers)[root]
+    exp_dates = _dates(expiry)
+    contracts = [
+        f"{r} {e} {'Call' if k else 'Put'} ${s:.2f}"
+        for r, e, k, s in zip(names, exp_dates, kind, strike)
+    ]
+    activity = _dates(day)
+    frame = pd.DataFrame({
+        "Activity Date": activity,
+        "Process Date": activity,
+        "Settle Date": _dates(day + 1),
+        "Instrument": np.where(ach, "", names),
+        "Description": [
+            "ACH Deposit" if c == "ACH" else f"Option Expiration for {d}" if c == "OEXP" else d
+            for c, d in zip(codes, contracts)
+        ],
+        "Trans Code": codes,
+        "Quantity": np.where(ach, "", qty.astype(str)),
+        "Price": np.where(ach | (codes == "OEXP"), "", [f"${p:,.2f}" for p in price]),
+        "Amount": np.where(codes == "OEXP", "", _money(amount, codes == "BTO")),
+    })
+    return frame[COLUMNS]
+
+
+def generate_trades(path, rows, seed=0, instruments=len(TICKERS)):
+    """Write a seeded synthetic broker CSV of `rows` trades to `path`."""
+    rng = np.random.default_rng(seed)
+    tickers = (TICKERS + [f"T{i:03d}" for i in range(max(0, instruments - len(TICKERS)))])[:instruments]
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", newline="", encoding="utf-8") as fh:
+        fh.write(",".join(COLUMNS) + "\n")
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            _chunk(rng, start, n, rows, tickers).to_csv(fh, header=False, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def dataset(directory, rows, seed=0):
+    """Path of the cached synthetic CSV for (rows, seed), generating it if needed."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"trades-{rows}-s{seed}-g{GENERATOR_VERSION}.csv")
+    if not os.path.exists(path):
+        generate_trades(path, rows, seed=seed)
+    return path
+
+
+# ─────────────────────────── stages ───────────────────────────
+def _stages(path):
+    """Yield (stage_name, thunk) in pipeline order; thunks share one handler."""
+    dh = HandleTradeData.__new__(HandleTradeData)
+    dh.file_path = path
+    state = {}
+
+    def load():
+        state["raw"] = dh.load_trades()
+
+    def schema():
+        dh.df = apply_schema(state["raw"].dropna(how="all"))
+
+    def summarize():
+        dh.summary = TradeSummary().update(dh.df)
+
+    def totals():
+        dh.summary._totals = None
+        return dh.summary.totals
+
+    yield "load_trades", load
+    yield "apply_schema", schema
+    yield "clean_amount_column", lambda: dh.clean_amount_column(dh.df)
+    yield "summary_update", summarize
+    yield "summary_totals", totals
+    yield "calculate_pnl", lambda: dh.calculate_pnl(dh.df)
+    yield "get_expiration_loss", dh.get_expiration_loss
+
+    registry = ToolRegistry(dh)
+    instrument = dh.pnl_df.sort_values("PnL").iloc[0]["Instrument"] if len(dh.pnl_df) else "SPY"
+    month = str(dh.df["Activity Date"].min())[:7]
+    args = {"calculate_profit_for_instrument": {"instrument": instrument}, "get_monthly_pnl": {"month": month}}
+    for tool in registry:
+        yield f"tool:{tool['name']}", lambda tool=tool: tool["callback"](**args.get(tool["name"], {}))
+
+    yield "init_total", lambda: HandleTradeData(path)
+    yield "init_streaming", lambda: HandleTradeData(path, chunksize=100_000)
+
+
+def _run_stages(path, memory):
+    results = {}
+    for name, thunk in _stages(path):
+        if memory:
+            tracemalloc.start()
+            thunk()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = peak
+        else:
+            calls = 1
+            started = time.perf_counter()
+            thunk()
+            elapsed = time.perf_counter() - started
+            if name.startswith("tool:"):   # microsecond-scale: average over a batch
+                calls = max(1, min(1000, int(0.05 / max(elapsed, 1e-7))))
+                started = time.perf_counter()
+                for _ in range(calls):
+                    thunk()
+                elapsed = (time.perf_counter() - started) / calls
+            results[name] = elapsed
+    return results
+
+
+def benchmark(path, repeat=3, memory=True):
+    """[{"stage", "seconds", "peak_bytes"}, ...] for one CSV; seconds is the best of `repeat` runs."""
+    timings = [_run_stages(path, memory=False) for _ in range(repeat)]
+    peaks = _run_stages(path, memory=True) if memory else {}
+    return [
+        {"stage": stage, "seconds": min(t[stage] for t in timings), "peak_bytes": peaks.get(stage)}
+        for stage in timings[0]
+    ]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rows_list, seed=0, repeat=3, memory=True, data_dir=".bench"):
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "repeat": repeat,
+            "generator_version": GENERATOR_VERSION,
+        },
+        "results": [],
+    }
+    for rows in rows_list:
+        path = dataset(data_dir, rows, seed=seed)
+        for entry in benchmark(path, repeat=repeat, memory=memory):
+            report["results"].append({"rows": rows, "file_bytes": os.path.getsize(path)} | entry)
+            print(f"{rows:>10,} rows  {entry['stage']:<42} {entry['seconds'] * 1000:>11.3f} ms", file=sys.stderr)
+    return report
+
+
+def compare(old, new):
+    """Rows of (rows, stage, old_s, new_s, speedup) for stages present in both reports."""
+    before = {(r["rows"], r["stage"]): r["seconds"] for r in old["results"]}
+    return [
+        (r["rows"], r["stage"], before[key], r["seconds"], before[key] / r["seconds"] if r["seconds"] else float("inf"))
+        for r in new["results"]
+        if (key := (r["rows"], r["stage"])) in before
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--data-dir", default=".bench", help="where generated CSVs are cached")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--generate-only", action="store_true", help="only write the CSVs")
+    args = parser.parse_args(argv)
+
+    if args.generate_only:
+        for rows in args.rows:
+            print(dataset(args.data_dir, rows, seed=args.seed))
+        return
+
+    report = run(args.rows, seed=args.seed, repeat=args.repeat, memory=not args.no_memory, data_dir=args.data_dir)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            old = json.load(fh)
+        print(f"\nvs {old['meta'].get('commit')}:", file=sys.stderr)
+        for rows, stage, old_s, new_s, speedup in compare(old, report):
+            print(f"{rows:>10,}  {stage:<42} {old_s * 1000:>10.3f} → {new_s * 1000:>10.3f} ms  ×{speedup:.2f}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
 # ollama pull  mistral
 # ollama pull nous-hermes:latest
 ollama pull dwightfoster03/functionary-small-v3.1
+# ollama pull mistral-nemo   # explain model of the "tiered" profile (OLLAMA_EXPLAIN_MODEL)
+# Keep models resident between questions (applies to an Ollama server started from this shell)
+export OLLAMA_KEEP_ALIVE="${OLLAMA_KEEP_ALIVE:-30m}"
+# Start loading the model now so it is ready by the time streamlit has started
+python warmup.py --keep-alive "$OLLAMA_KEEP_ALIVE" &
 streamlit run app.py
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_hash(data):
+    """SHA-256 hex digest of raw bytes or of a file-like object's full contents."""
+    if hasattr(data, "getvalue"):          # Streamlit UploadedFile / BytesIO
+        data = data.getvalue()
+    elif hasattr(data, "read"):
+        pos = data.tell()
+        data.seek(0)
+        raw = data.read()
+        data.seek(pos)
+        data = raw
+    elif isinstance(data, str):
+        with open(data, "rb") as fh:
+            data = fh.read()
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and (approximate) byte size.
+
+    `sizeof` is called once per stored value to account for its memory; the
+    least recently used entries are evicted until both limits hold again.
+    """
+
+    def __init__(self, max_entries=8, max_bytes=None, sizeof=sys.getsizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()   # key -> (value, nbytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key][0]
+
+    def put(self, key, value):
+        nbytes = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self.bytes -= self._data.pop(key)[1]
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return value   # too large to ever fit – hand back uncached
+            self._data[key] = (value, nbytes)
+            self.bytes += nbytes
+            self._evict()
+        return value
+
+    def get_or_create(self, key, factory):
+        """Return the cached value for `key`, building it with `factory()` on a miss."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, factory())
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, nbytes = self._data.pop(key)
+            self.bytes -= nbytes
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _evict(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, (_, nbytes) = self._data.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+
+
+class ResponseCache:
+    """Two-tier cache for JSON-serialisable responses with a time-to-live.
+
+    The memory tier is an LRUCache; the optional disk tier stores one JSON file
+    per key under `directory` so answers survive restarts; `cleanup()` keeps
+    it within `max_bytes`. Setting `bypass` turns every lookup into a miss
+    (and skips storing) without dropping entries.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600, directory=None, bypass=False, max_bytes=256 * 1024**2):
+        self.memory = LRUCache(max_entries=max_entries)
+        self.ttl = ttl
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        if self.bypass:
+            return None
+        now = time.time()
+        entry = self.memory.get(key)
+        if entry is None and self.directory:
+            try:
+                with open(self._path(key), encoding="utf-8") as fh:
+                    entry = json.load(fh)
+                self.memory.put(key, entry)
+                self.disk_hits += 1
+            except (OSError, ValueError):
+                entry = None
+        if entry is None or entry["expires"] < now:
+            if entry is not None:
+                self.invalidate(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def put(self, key, value):
+        if self.bypass:
+            return value
+        entry = {"expires": time.time() + self.ttl, "value": value}
+        self.memory.put(key, entry)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh)
+            os.replace(tmp, path)
+        return value
+
+    def invalidate(self, key):
+        self.memory.pop(key)
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def cleanup(self):
+        """Apply the age / size policy to the disk tier. Returns the number of files removed.
+
+        A file is written when its entry is stored, so one older than `ttl`
+        has expired; the oldest of the rest go until the tier fits `max_bytes`.
+        """
+        if not self.directory:
+            return 0
+        now = time.time()
+        removed = 0
+        live = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if ".tmp" in name:
+                    if now - stat.st_mtime < 3600:
+                        continue   # another process may still be writing it
+                elif now - stat.st_mtime <= self.ttl:
+                    live.append((stat.st_mtime, stat.st_size, path))
+                    continue
+                _remove(path)
+                removed += 1
+
+        total = sum(size for _, size, _ in live)
+        for _, size, path in sorted(live):   # oldest first
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.memory),
+        }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_MISSING = object()
@@ -0,0 +1,101 @@
+import json
+
+# Rough chars-per-token ratio for English/JSON text on Llama-family tokenizers
+CHARS_PER_TOKEN = 4
+TRUNCATION_NOTE = "\n…[truncated {n} chars]"
+
+
+def estimate_tokens(value):
+    """Cheap token estimate for a string (or any JSON-serialisable value)."""
+    if value is None:
+        return 0
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(m):
+    # Content plus a small per-message overhead for role / name framing
+    return 4 + estimate_tokens(m.get("content")) + estimate_tokens(m.get("function_call")) + estimate_tokens(m.get("tool_calls"))
+
+
+def _turns(history):
+    """Split history into (pinned system messages, [turn, ...]); a turn starts at a real user question."""
+    pinned, turns = [], []
+    for m in history:
+        if m["role"] == "system":
+            pinned.append(m)
+        elif m["role"] == "user" and not m.get("synthetic") or not turns:
+            turns.append([m])
+        else:
+            turns[-1].append(m)
+    return pinned, turns
+
+
+def _compact_turn(turn):
+    # A finished turn is kept as the question and the last assistant reply;
+    # tool outputs, synthetic prompts and intermediate replies are dropped.
+    question = [m for m in turn[:1] if m["role"] == "user"]
+    replies = [m for m in turn if m["role"] == "assistant" and m.get("content")]
+    return question + replies[-1:]
+
+
+def _truncate(m, max_tokens):
+    content = m.get("content") or ""
+    keep = max(0, (max_tokens - 6) * CHARS_PER_TOKEN - len(TRUNCATION_NOTE) - 8)
+    if len(content) <= keep:
+        return m
+    return m | {"content": content[:keep] + TRUNCATION_NOTE.format(n=len(content) - keep)}
+
+
+def fit_context(history, budget, tools=None):
+    """Return (messages, metrics): `history` trimmed to fit `budget` prompt tokens.
+
+    The system prompt is always kept. Earlier turns are compacted to
+    question + final answer, then the oldest ones are dropped; if the current
+    turn alone is still too large its tool outputs are truncated. `history`
+    itself is not modified.
+    """
+    tokens_in = sum(message_tokens(m) for m in history)
+    tools_tokens = estimate_tokens(tools)
+    metrics = {
+        "messages_in": len(history),
+        "tokens_in": tokens_in + tools_tokens,
+        "tools_tokens": tools_tokens,
+        "budget": budget,
+        "dropped_turns": 0,
+        "truncated": 0,
+    }
+    if budget is None or tokens_in + tools_tokens <= budget:
+        metrics |= {"messages_out": len(history), "tokens_out": tokens_in + tools_tokens}
+        return list(history), metrics
+
+    pinned, turns = _turns(history)
+    current = turns[-1] if turns else []
+    stale = [_compact_turn(t) for t in turns[:-1]]
+
+    def total():
+        return tools_tokens + sum(message_tokens(m) for m in pinned + current) + sum(
+            message_tokens(m) for t in stale for m in t
+        )
+
+    while stale and total() > budget:
+        stale.pop(0)
+        metrics["dropped_turns"] += 1
+
+    overflow = total() - budget
+    if overflow > 0:
+        # Largest tool/function outputs of the current turn give way first
+        for i in sorted(
+            (i for i, m in enumerate(current) if m["role"] in ("tool", "function")),
+            key=lambda i: -message_tokens(current[i]),
+        ):
+            if overflow <= 0:
+                break
+            before = message_tokens(current[i])
+            current[i:i + 1] = [_truncate(current[i], max(16, before - overflow))]
+            overflow -= before - message_tokens(current[i])
+            metrics["truncated"] += 1
+
+    messages = pinned + [m for t in stale for m in t] + current
+    metrics |= {"messages_out": len(messages), "tokens_out": total()}
+    return messages, metrics
@@ -0,0 +1,68 @@
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from functions import default_handler
+from perf import span
+
+
+class ToolExecutor:
+    """Runs the tool calls of one model turn concurrently on a bounded thread pool.
+
+    Callbacks are looked up by name in a dict built once from `function_defs`.
+    `run()` waits at most `timeout` seconds per call and returns results in
+    the original call order, so a turn costs about as long as its slowest tool.
+    A failed or timed-out call yields an error string for the model instead
+    of raising; an unknown tool name falls back to `default_handler`.
+    """
+
+    def __init__(self, function_defs, pool=None, max_workers=4, timeout=30):
+        self.registry = {f["name"]: f["callback"] for f in function_defs}
+        self.pool = pool or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.timeout = timeout
+
+    def _call(self, fn_name, args):
+        callback = self.registry.get(fn_name, default_handler)
+        with span(f"tool.{fn_name}", args=args):
+            started = time.perf_counter()
+            result = callback(**args) if args else callback()
+            return result, time.perf_counter() - started
+
+    def run(self, calls):
+        """Execute [(name, arguments_json, call_id), ...].
+
+        Returns [{"name", "args", "call_id", "result", "seconds", "error"}, ...]
+        in the same order as `calls`.
+        """
+        jobs = []
+        for fn_name, arguments, call_id in calls:
+            entry = {"name": fn_name, "call_id": call_id, "error": None, "seconds": 0.0}
+            try:
+                entry["args"] = json.loads(arguments or "{}")
+            except json.JSONDecodeError as exc:
+                entry |= {"args": {}, "error": f"invalid arguments: {exc}"}
+                jobs.append((entry, None))
+                continue
+            # copy_context: the worker's spans stay in the caller's trace
+            context = contextvars.copy_context()
+            jobs.append((entry, self.pool.submit(context.run, self._call, fn_name, entry["args"])))
+
+        # Calls were submitted together, so one deadline gives each the full timeout
+        deadline = time.perf_counter() + self.timeout
+        results = []
+        for entry, future in jobs:
+            if future is not None:
+                try:
+                    entry["result"], entry["seconds"] = future.result(
+                        timeout=max(0.0, deadline - time.perf_counter())
+                    )
+                except FutureTimeout:
+                    future.cancel()
+                    entry["error"] = f"timed out after {self.timeout}s"
+                except Exception as exc:   # surface tool failures to the model, not the UI
+                    entry["error"] = f"{type(exc).__name__}: {exc}"
+            if entry["error"]:
+                entry["result"] = f"Error running {entry['name']}: {entry['error']}"
+            results.append(entry)
+        return results
@@ -1,6 +1,15 @@
-def default_handler():
+from types import MappingProxyType
+
+
+def default_handler(*args, **kwargs):
     return "I may not be having the necessary tool to give an accurate answer on that question."
 
+# Optional on every tool of a multi-account Portfolio: restrict the answer to one uploaded account (file name)
+ACCOUNT_PARAMETER = {
+    "type": "string",
+    "description": "Account (uploaded file name) to answer for; omit for all accounts combined",
+}
+
 FUNCTION_DEFS = [
     {
         "name": "calculate_profit_for_instrument",
@@ -8,7 +17,7 @@ FUNCTION_DEFS = [
         "parameters": {
             "type": "object",
             "properties": {
-                "instrument": {"type": "string", "description": "Ticker / option root"}
+                "instrument": {"type": "string", "description": "Ticker / option root"},
             },
             "required": ["instrument"],
         },
@@ -16,7 +25,7 @@ FUNCTION_DEFS = [
     },
     {
         "name": "get_max_transaction",
-        "description": "Largest absolute Amount value in the trade log (positive or negative).",
+        "description": "Best-performing instrument and its realised profit/loss.",
         "parameters": {"type": "object", "properties": {}},
         "callback": default_handler,
     },
@@ -38,15 +47,110 @@ FUNCTION_DEFS = [
         "description": "give risk management advice based on the trade log.",
         "parameters": {"type": "object", "properties": {}},
         "callback": default_handler,
-    }
+    },
+    {
+        "name": "get_monthly_pnl",
+        "description": "Realised profit or loss for one calendar month, optionally for a single symbol.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "month": {"type": "string", "description": "Month as YYYY-MM"},
+                "instrument": {"type": "string", "description": "Ticker / option root (omit for all symbols)"},
+            },
+            "required": ["month"],
+        },
+        "callback": default_handler,
+    },
 ]
 
-def map_agent_func_to_trade_data_handler(data_handler):
-    """Map the function names to the data handler methods."""
-    FUNCTION_DEFS[0]["callback"] = data_handler.get_amount_for_instrument
-    FUNCTION_DEFS[1]["callback"] = data_handler.get_max_amount_for_instrument
-    FUNCTION_DEFS[2]["callback"] = data_handler.calculate_ach_transactions_sum
-    FUNCTION_DEFS[3]["callback"] = data_handler.calculate_exp_loss_percentage
-    FUNCTION_DEFS[4]["callback"] = data_handler.risk_management_advice
-    return FUNCTION_DEFS
+# Handler method behind each tool
+TOOL_METHODS = {
+    "calculate_profit_for_instrument": "get_amount_for_instrument",
+    "get_max_transaction": "get_max_amount_for_instrument",
+    "calculate_ach_transactions_sum": "calculate_ach_transactions_sum",
+    "calculate_exp_loss_percentage": "calculate_exp_loss_percentage",
+    "risk_management_advice": "risk_management_advice",
+    "get_monthly_pnl": "get_monthly_pnl",
+}
+
+
+def make_tool_schema(fn_defs):
+    """Wrap our function definitions in the new `tools` schema."""
+    return [
+        {"type": "function", "function": {k: v for k, v in f.items() if k != "callback"}}
+        for f in fn_defs
+    ]
+
+
+def _with_account(f):
+    params = f["parameters"]
+    return f | {"parameters": params | {"properties": params["properties"] | {"account": ACCOUNT_PARAMETER}}}
+
 
+# Portfolio handlers also take `account=`; plain HandleTradeData methods do not
+PORTFOLIO_FUNCTION_DEFS = [_with_account(f) for f in FUNCTION_DEFS]
+
+# Schemas do not depend on the data, so they are built once per process
+TOOLS_SCHEMA = make_tool_schema(FUNCTION_DEFS)
+FUNCTIONS_SCHEMA = [s["function"] for s in TOOLS_SCHEMA]   # legacy 0613 `functions=` form
+PORTFOLIO_TOOLS_SCHEMA = make_tool_schema(PORTFOLIO_FUNCTION_DEFS)
+PORTFOLIO_FUNCTIONS_SCHEMA = [s["function"] for s in PORTFOLIO_TOOLS_SCHEMA]
+
+
+class ToolRegistry:
+    """Set of tools bound to one trade data handler.
+
+    Each session builds its own registry, so concurrent sessions never see
+    each other's data; the module-level FUNCTION_DEFS are left untouched.
+    Iterating yields read-only definition mappings with a bound "callback",
+    which is what the pipeline and ToolExecutor expect. Only the top level
+    is read-only: the nested "parameters" schemas are the ones shared with
+    FUNCTION_DEFS and TOOLS_SCHEMA and must not be modified.
+    """
+
+    __slots__ = ("handler", "portfolio", "_defs", "_by_name")
+
+    def __init__(self, data_handler):
+        # Only a multi-account Portfolio advertises (and accepts) the `account` parameter
+        portfolio = getattr(data_handler, "accounts", None) is not None
+        defs = tuple(
+            MappingProxyType(f | {"callback": getattr(data_handler, TOOL_METHODS[f["name"]])})
+            for f in (PORTFOLIO_FUNCTION_DEFS if portfolio else FUNCTION_DEFS)
+        )
+        object.__setattr__(self, "handler", data_handler)
+        object.__setattr__(self, "portfolio", portfolio)
+        object.__setattr__(self, "_defs", defs)
+        object.__setattr__(self, "_by_name", MappingProxyType({f["name"]: f for f in defs}))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ToolRegistry is immutable")
+
+    def __iter__(self):
+        return iter(self._defs)
+
+    def __len__(self):
+        return len(self._defs)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def callback(self, name):
+        """Bound callback for a tool name, or default_handler for an unknown one."""
+        entry = self._by_name.get(name)
+        return entry["callback"] if entry else default_handler
+
+    @property
+    def tools_schema(self):
+        return PORTFOLIO_TOOLS_SCHEMA if self.portfolio else TOOLS_SCHEMA
+
+    @property
+    def functions_schema(self):
+        return PORTFOLIO_FUNCTIONS_SCHEMA if self.portfolio else FUNCTIONS_SCHEMA
+
+
+def map_agent_func_to_trade_data_handler(data_handler):
+    """Tool definitions bound to `data_handler` (a ToolRegistry; FUNCTION_DEFS is not modified)."""
+    return ToolRegistry(data_handler)
@@ -0,0 +1,244 @@
+import copy
+import hashlib
+import json
+import re
+import time
+from functions import make_tool_schema   # still importable from here
+from context import estimate_tokens
+from backends import FUNCTIONARY, ModelTiers, ToolsBackend
+from perf import span
+
+# ──────────────── Ollama-backed model backends ────────────────
+# Requests go through the pooled process-wide client (see llm_client / backends)
+MODEL = FUNCTIONARY          # tool-calling model
+DEFAULT_TIERS = ModelTiers(ToolsBackend(MODEL))
+
+
+# ───────────────────── helper utilities ──────────────────────
+def _to_openai_messages(history):
+    """Convert local chat dicts → OpenAI SDK format."""
+    formatted = []
+    for m in history:
+        role = m["role"]
+        base = {"role": role}
+
+        if role == "assistant" and "function_call" in m:
+            base |= {"content": None, "function_call": m["function_call"]}
+        elif role == "tool":
+            base |= {"name": m["name"], "tool_call_id": m["tool_call_id"], "content": m["content"]}
+        else:
+            base["content"] = m["content"]
+
+        formatted.append(base)
+    return formatted
+
+
+def response_cache_key(model, messages, tools, data_hash):
+    """Stable key for one completion request against one trade data set."""
+    normalized = [
+        {k: v.strip() if isinstance(v, str) else v for k, v in m.items()}
+        for m in messages
+    ]
+    payload = json.dumps(
+        {"model": model, "messages": normalized, "tools": tools, "data": data_hash},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _record_usage(attrs, usage, messages, tools, out):
+    # Server-reported token counts when available, else the chars/4 estimate
+    if usage is not None:
+        attrs.update(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+    else:
+        attrs.update(
+            prompt_tokens=estimate_tokens(messages) + estimate_tokens(tools),
+            completion_tokens=estimate_tokens(out.get("content")) + estimate_tokens(out.get("tool_calls")),
+            estimated=True,
+        )
+
+
+def call_llm(history, tools=None, cache=None, data_hash=None, backends=None):
+    """Send chat history to the model and return the next message.
+
+    `backends` (a backends.ModelTiers, default functionary for every pass)
+    decides which model and protocol serve the request: the tool-selection
+    tier when `tools` are given, the explanation tier otherwise.
+    With a ResponseCache, identical requests (same model, normalized messages,
+    tool schema and trade data hash) are answered without inference.
+    Each call is recorded as an "llm.call" timing span with token counts.
+    """
+    backend = (backends or DEFAULT_TIERS).for_request(tools)
+    with span("llm.call", model=backend.model, backend=backend.style, stream=False) as attrs:
+        return _complete(backend, history, tools, cache, data_hash, attrs)
+
+
+def _complete(backend, history, tools, cache, data_hash, attrs):
+    messages = _to_openai_messages(history)
+    key = None
+    if cache is not None:
+        key = response_cache_key(backend.model, messages, tools, data_hash)
+        cached = cache.get(key)
+        attrs["cached"] = cached is not None
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+    out, usage = backend.complete(messages, tools)
+    _record_usage(attrs, usage, messages, tools, out)
+    if key is not None:
+        cache.put(key, copy.deepcopy(out))
+    return out
+
+
+class JsonTextStreamer:
+    """Incrementally pull displayable text out of a streamed JSON-mode reply.
+
+    Shows the first string-valued field of the object as it is generated,
+    switching to an "answer"-like field if one starts later (escape sequences
+    decoded, incomplete ones held back). Replies that are not JSON objects are
+    passed through as plain text.
+    """
+
+    _FIELD_START = re.compile(r'"((?:[^"\\]|\\.)*)"\s*:\s*"')
+    _HEX4 = re.compile(r"[0-9a-fA-F]{4}")
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+    PREFERRED_KEYS = ("answer", "value", "explanation", "response", "message")
+
+    def __init__(self):
+        self.buffer = ""
+        self.text = ""
+        self._scan = 0          # where to look for the next field
+        self._pos = None        # inside a string value: index where decoding continues
+        self._streaming = False # whether the current string value is the one shown
+        self._preferred = False # whether the shown field is an answer-like key
+
+    def feed(self, chunk):
+        """Add raw model output; returns the text visible so far."""
+        self.buffer += chunk
+        stripped = self.buffer.lstrip()
+        if stripped and not stripped.startswith("{"):
+            self.text = self.buffer      # plain-text reply
+            return self.text
+
+        buf = self.buffer
+        while not (self._preferred and self._pos is None and self.text):
+            if self._pos is None:
+                match = self._FIELD_START.search(buf, self._scan)
+                if not match:
+                    break
+                preferred = match.group(1).lower() in self.PREFERRED_KEYS
+                self._streaming = not self.text or (preferred and not self._preferred)
+                if self._streaming:
+                    self.text, self._preferred = "", preferred
+                self._pos = match.end()
+
+            i, closed = self._pos, False
+            while i < len(buf):
+                ch = buf[i]
+                if ch == '"':
+                    closed = True
+                    i += 1
+                    break
+                if ch == "\\":
+                    if i + 1 >= len(buf) or (buf[i + 1] == "u" and i + 6 > len(buf)):
+                        break                    # escape split across chunks
+                    esc = buf[i + 1]
+                    if esc == "u" and self._HEX4.fullmatch(buf, i + 2, i + 6):
+                        decoded, i = chr(int(buf[i + 2:i + 6], 16)), i + 6
+                    elif esc == "u":   # malformed \uXXXX: show it as written, keep decoding after "\u"
+                        decoded, i = buf[i:i + 2], i + 2
+                    else:
+                        decoded, i = self._ESCAPES.get(esc, esc), i + 2
+                else:
+                    decoded = ch
+                    i += 1
+                if self._streaming:
+                    self.text += decoded
+            if not closed:
+                self._pos = i
+                break
+            self._pos, self._scan = None, i
+        return self.text
+
+
+def stream_llm(history, tools=None, on_text=None, cache=None, data_hash=None, metrics=None, backends=None):
+    """Streaming variant of call_llm.
+
+    `on_text(text)` is called with the answer text visible so far every time new
+    tokens arrive; tool calls (and legacy function calls) are assembled from the
+    streamed deltas. Backends that cannot stream answer in one piece. Returns
+    the same message dict as call_llm. When given, the `metrics` dict receives
+    time-to-first-token and total seconds; the same figures and token counts
+    are recorded as an "llm.call" timing span.
+    """
+    backend = (backends or DEFAULT_TIERS).for_request(tools)
+    with span("llm.call", model=backend.model, backend=backend.style, stream=True) as attrs:
+        out = _stream(backend, history, tools, on_text, cache, data_hash, attrs)
+        if metrics is not None:
+            metrics.update(first_token_s=attrs.get("first_token_s"), total_s=attrs["total_s"])
+        return out
+
+
+def _stream(backend, history, tools, on_text, cache, data_hash, attrs):
+    start = time.perf_counter()
+    if not backend.streams:
+        out = _complete(backend, history, tools, cache, data_hash, attrs)
+        if on_text and out.get("content"):
+            on_text(JsonTextStreamer().feed(out["content"]))
+        attrs.update(first_token_s=time.perf_counter() - start, total_s=time.perf_counter() - start)
+        return out
+
+    messages = _to_openai_messages(history)
+    key = None
+    if cache is not None:
+        key = response_cache_key(backend.model, messages, tools, data_hash)
+        cached = cache.get(key)
+        attrs["cached"] = cached is not None
+        if cached is not None:
+            if on_text and cached.get("content"):
+                on_text(JsonTextStreamer().feed(cached["content"]))
+            attrs.update(first_token_s=time.perf_counter() - start, total_s=time.perf_counter() - start)
+            return copy.deepcopy(cached)
+
+    stream = backend.stream(messages, tools)
+    streamer = JsonTextStreamer()
+    role, content = "assistant", []
+    tool_calls = {}       # index -> {"id", "name", "arguments"}
+    function_call = None
+    first_token = None
+    usage = None
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage   # final chunk when include_usage is honoured
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if first_token is None and (delta.content or delta.tool_calls or delta.function_call):
+            first_token = time.perf_counter() - start
+        role = delta.role or role
+        if delta.content:
+            content.append(delta.content)
+            if on_text:
+                on_text(streamer.feed(delta.content))
+        for c in delta.tool_calls or []:
+            call = tool_calls.setdefault(c.index, {"id": None, "name": "", "arguments": ""})
+            call["id"] = c.id or call["id"]
+            if c.function is not None:
+                call["name"] += c.function.name or ""
+                call["arguments"] += c.function.arguments or ""
+        if delta.function_call:  # legacy fallback
+            function_call = function_call or {"name": "", "arguments": ""}
+            function_call["name"] += delta.function_call.name or ""
+            function_call["arguments"] += delta.function_call.arguments or ""
+
+    out = {"role": role, "content": "".join(content) or None}
+    if tool_calls:
+        out["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+    elif function_call:
+        out["function_call"] = function_call
+    attrs.update(first_token_s=first_token, total_s=time.perf_counter() - start)
+    _record_usage(attrs, usage, messages, tools, out)
+    if key is not None:
+        cache.put(key, copy.deepcopy(out))
+    return out
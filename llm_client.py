@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import threading
+
+import httpx
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# Requests Ollama serves at once (its OLLAMA_NUM_PARALLEL); anything above that only queues server-side
+MAX_CONCURRENCY = int(os.environ.get("OLLAMA_NUM_PARALLEL", 4))
+
+_DONE = object()
+
+
+def _request_key(kwargs):
+    payload = json.dumps(kwargs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class AsyncLLMClient:
+    """Process-wide OpenAI-compatible client running on its own event loop thread.
+
+    One AsyncOpenAI instance over a keep-alive httpx connection pool serves
+    every session. At most `max_concurrency` requests are in flight; identical
+    non-streaming requests issued while one is already running share its
+    response instead of reaching the server twice. The blocking wrappers
+    (`complete`, `stream`, `native`) are for Streamlit script threads;
+    `submit` returns a concurrent.futures.Future for fanning out many calls.
+    The `a*` coroutines must be awaited on `self.loop`.
+    """
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, max_concurrency=MAX_CONCURRENCY, timeout=600, keepalive_expiry=300):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.stats = {"requests": 0, "coalesced": 0, "in_flight": 0, "peak_in_flight": 0}
+        self._inflight = {}   # request key -> asyncio.Task
+        self._openai = None
+        self._timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="llm-client", daemon=True).start()
+        limits = httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._run(self._setup(limits, timeout)).result()
+
+    async def _setup(self, limits, timeout):
+        # Loop-bound objects are created on the loop that will use them
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.http = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=timeout)
+
+    @property
+    def openai(self):
+        """AsyncOpenAI over the shared pool; the SDK is imported on first use, not at startup."""
+        if self._openai is None:
+            from openai import AsyncOpenAI
+            self._openai = AsyncOpenAI(base_url=f"{self.base_url}/v1", api_key="ollama",
+                                       http_client=self.http, timeout=self._timeout)
+        return self._openai
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _limited(self, make_coro):
+        async with self._semaphore:
+            self.stats["in_flight"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                return await make_coro()
+            finally:
+                self.stats["in_flight"] -= 1
+
+    # ── chat completions
+    async def acomplete(self, **kwargs):
+        key = _request_key(kwargs)
+        task = self._inflight.get(key)
+        if task is None:
+            task = self.loop.create_task(self._limited(lambda: self.openai.chat.completions.create(**kwargs)))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.stats["requests"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        # shield: one waiter giving up must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def submit(self, **kwargs):
+        return self._run(self.acomplete(**kwargs))
+
+    def complete(self, **kwargs):
+        return self.submit(**kwargs).result()
+
+    def stream(self, **kwargs):
+        """Yield chat.completion chunks of a streamed request as they arrive."""
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                response = await self.openai.chat.completions.create(stream=True, **kwargs)
+                async for chunk in response:
+                    chunks.put(chunk)
+            except Exception as exc:
+                chunks.put(exc)
+            finally:
+                chunks.put(_DONE)
+
+        async def start():
+            self.stats["requests"] += 1
+            await self._limited(pump)
+
+        future = self._run(start())
+        try:
+            while (item := chunks.get()) is not _DONE:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()   # consumer stopped early: free the connection and slot
+
+    # ── native Ollama endpoints (/api/...) over the same pool
+    async def anative(self, path, payload):
+        async def post():
+            resp = await self.http.post(path, json=payload)
+            resp.raise_for_status()
+            return resp.json()
+
+        self.stats["requests"] += 1
+        return await self._limited(post)
+
+    def native(self, path, payload):
+        return self._run(self.anative(path, payload)).result()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_client(**kwargs):
+    """The process-wide AsyncLLMClient (created on first use with `kwargs`)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AsyncLLMClient(**kwargs)
+    return _shared
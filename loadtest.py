@@ -0,0 +1,176 @@
+"""Load test of the chat orchestration: N concurrent sessions against the stub model server.
+
+    python loadtest.py --sessions 8 --turns 5 --latency 0.2 --token-delay 0.005
+    python loadtest.py --base-url http://localhost:11434 --sessions 4   # a real Ollama
+
+Each session keeps its own chat history and asks --turns questions in a
+row through pipeline.answer_question, the same path app.py uses (shared
+tool pool and pooled model client). Reports throughput and per-question
+latency percentiles; --output writes the full JSON report.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backends import DEFAULT_PROFILE, PROFILES
+from benchmark import dataset
+from executor import ToolExecutor
+from functions import ToolRegistry
+from llm_client import MAX_CONCURRENCY, shared_client
+from perf import tracer
+from pipeline import ANSWER_MODES, SYSTEM_PROMPT, answer_question
+from router import IntentRouter, new_router_stats, router_summary
+from stub_server import StubServer
+from utils import HandleTradeData
+
+# Same prompt budget as app.py, so sessions trim history like the app does
+CONTEXT_TOKEN_BUDGET = 3000
+QUESTIONS = [
+    "What is the total of my ACH transactions?",
+    "How much did I lose on expired options?",
+    "What percentage of my losses came from expirations?",
+    "Which instruments were most profitable?",
+    "What was my profit on SPY?",
+    "Give me some risk management advice",
+    "How did I do in 2024-03?",
+    "Summarize my trading performance",
+]
+
+
+def run_session(index, dh, questions, turns, mode, tool_pool, router_stats, stream, context_budget=None, backends=None):
+    """One simulated user: `turns` questions in a row on one chat history."""
+    tools = ToolRegistry(dh)
+    executor = ToolExecutor(tools, pool=tool_pool)
+    router = IntentRouter.for_handler(dh, stats=router_stats) if router_stats is not None else None
+    chat = [{"role": "system", "content": SYSTEM_PROMPT}]
+    rows = []
+    for turn in range(turns):
+        question = questions[(index + turn) % len(questions)]
+        row = {"session": index, "turn": turn, "question": question, "error": None}
+        started = time.perf_counter()
+        try:
+            answer, stats = answer_question(
+                question, chat, tools, tools.tools_schema, mode=mode,
+                on_text=(lambda text: None) if stream else None,
+                context_budget=context_budget, executor=executor, router=router, backends=backends,
+            )
+            row |= {"model_calls": stats["model_calls"], "tool_calls": stats["tool_calls"],
+                    "routed": stats["routed"], "first_token_s": stats.get("first_token_s")}
+        except Exception as exc:
+            row["error"] = f"{type(exc).__name__}: {exc}"
+        row["seconds"] = time.perf_counter() - started
+        rows.append(row)
+    return rows
+
+
+def _percentiles(values, quantiles=(50, 90, 95, 99)):
+    if not values:
+        return {}
+    return {f"p{q}": float(v) for q, v in zip(quantiles, np.percentile(values, quantiles))} | {"max": max(values)}
+
+
+def load_test(path, sessions=8, turns=5, mode="template", questions=QUESTIONS, use_router=True, stream=False,
+              context_budget=CONTEXT_TOKEN_BUDGET, profile=DEFAULT_PROFILE):
+    """Run `sessions` concurrent sessions over one trade CSV; returns the report dict."""
+    dh = HandleTradeData(path)
+    router_stats = new_router_stats() if use_router else None
+    shared_client().openai   # import the SDK now, not inside the first timed question
+    tracer.records.clear()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as session_pool, \
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="tool") as tool_pool:
+        futures = [
+            session_pool.submit(run_session, i, dh, questions, turns, mode, tool_pool, router_stats, stream,
+                                context_budget, PROFILES[profile])
+            for i in range(sessions)
+        ]
+        results = [row for f in futures for row in f.result()]
+    wall = time.perf_counter() - started
+
+    ok = [r for r in results if r["error"] is None]
+    first_tokens = [r["first_token_s"] for r in ok if r.get("first_token_s") is not None]
+    return {
+        "summary": {
+            "sessions": sessions,
+            "turns": turns,
+            "mode": mode,
+            "profile": profile,
+            "stream": stream,
+            "questions": len(results),
+            "errors": len(results) - len(ok),
+            "wall_s": wall,
+            "questions_per_s": len(results) / wall if wall else 0.0,
+            "model_calls": sum(r["model_calls"] for r in ok),
+            "latency_s": _percentiles([r["seconds"] for r in ok]),
+            "first_token_s": _percentiles(first_tokens),
+            "client": dict(shared_client().stats),
+            "router": router_summary(router_stats) if router_stats is not None else None,
+            "spans": tracer.percentiles(window=len(tracer.records) or 1),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=5, help="questions per session")
+    parser.add_argument("--mode", choices=ANSWER_MODES, default="template")
+    parser.add_argument("--profile", choices=list(PROFILES), default=DEFAULT_PROFILE, help="model backends (see backends.PROFILES)")
+    parser.add_argument("--stream", action="store_true", help="stream answers like the app does")
+    parser.add_argument("--no-router", action="store_true", help="always ask the model to pick tools")
+    parser.add_argument("--questions", help="file with one question per line")
+    parser.add_argument("--csv", help="trade CSV to load (default: a generated one)")
+    parser.add_argument("--rows", type=int, default=10_000, help="rows of the generated CSV")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="model requests in flight")
+    parser.add_argument("--base-url", help="use this server instead of starting the stub")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub: seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="stub: seconds between streamed chunks")
+    parser.add_argument("--script", help="stub: JSON file of response rules")
+    parser.add_argument("-o", "--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as fh:
+            questions = [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as fh:
+            script = json.load(fh)
+
+    stub = None
+    base_url = args.base_url
+    if not base_url:
+        stub = StubServer(latency=args.latency, token_delay=args.token_delay, script=script).start()
+        base_url = stub.url
+    shared_client(base_url=base_url, max_concurrency=args.concurrency)   # first use fixes the endpoint
+    path = args.csv or dataset(".bench", args.rows)
+    try:
+        report = load_test(path, args.sessions, args.turns, args.mode, questions,
+                           use_router=not args.no_router, stream=args.stream, profile=args.profile)
+        if stub:
+            report["summary"]["server"] = dict(stub.stats)
+    finally:
+        if stub:
+            stub.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, default=str)
+            fh.write("\n")
+    s = report["summary"]
+    lat = s["latency_s"]
+    print(f"{s['questions']} questions in {s['sessions']} sessions: {s['wall_s']:.2f}s, "
+          f"{s['questions_per_s']:.2f} q/s, {s['model_calls']} model calls, {s['errors']} errors")
+    if lat:
+        print("latency " + "  ".join(f"{k} {v * 1000:.0f}ms" for k, v in lat.items()))
+    return 1 if s["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
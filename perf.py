@@ -0,0 +1,109 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Spans opened inside `tracer.trace(...)` carry its id (one id per question)
+_current_trace = contextvars.ContextVar("perf_trace", default=None)
+
+
+def current_trace():
+    """Trace id of the enclosing `tracer.trace()` block, or None."""
+    return _current_trace.get()
+
+
+class Tracer:
+    """Structured timing spans, kept in a bounded in-memory ring and
+    optionally appended to a JSON-lines file.
+
+    Each record is {"trace", "span", "start", "seconds", **attributes};
+    attributes can be added to the yielded dict while the span is open.
+    Spans opened in worker threads keep their trace when the work is
+    submitted under `contextvars.copy_context()`.
+    """
+
+    def __init__(self, path=None, max_records=5000):
+        self.path = path
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._captures = []
+
+    def configure(self, path=None, max_records=None):
+        with self._lock:
+            self.path = path
+            if path:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if max_records:
+                self.records = deque(self.records, maxlen=max_records)
+
+    @contextmanager
+    def trace(self, trace_id=None):
+        """Group every span opened inside the block under one trace id."""
+        trace_id = trace_id or uuid.uuid4().hex[:12]
+        token = _current_trace.set(trace_id)
+        try:
+            yield trace_id
+        finally:
+            _current_trace.reset(token)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        record = {"trace": _current_trace.get(), "span": name, "start": time.time()}
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            record["seconds"] = time.perf_counter() - started
+            self.record(record | attributes)
+
+    def record(self, *records):
+        """Store finished span records (e.g. ones shipped back from a worker process)."""
+        with self._lock:
+            self.records.extend(records)
+            for captured in self._captures:
+                captured.extend(records)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as fh:
+                    for r in records:
+                        fh.write(json.dumps(r, default=str) + "\n")
+
+    @contextmanager
+    def capture(self):
+        """Collect the records created inside the block into a list (for shipping across processes)."""
+        captured = []
+        with self._lock:
+            self._captures.append(captured)
+        try:
+            yield captured
+        finally:
+            with self._lock:
+                self._captures.remove(captured)
+
+    def for_trace(self, trace_id):
+        with self._lock:
+            return [r for r in self.records if r["trace"] == trace_id]
+
+    def percentiles(self, window=500, quantiles=(50, 90, 99)):
+        """{span_name: {"count", "p50", "p90", "p99"}} in seconds over the last `window` records."""
+        with self._lock:
+            recent = list(self.records)[-window:]
+        by_name = {}
+        for r in recent:
+            by_name.setdefault(r["span"], []).append(r["seconds"])
+        return {
+            name: {"count": len(values)} | {
+                f"p{q}": float(v) for q, v in zip(quantiles, np.percentile(values, quantiles))
+            }
+            for name, values in sorted(by_name.items())
+        }
+
+
+# Process-wide tracer used by the ingestion, model and tool code paths
+tracer = Tracer()
+span = tracer.span
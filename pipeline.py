@@ -0,0 +1,233 @@
+import json
+import math
+import time
+import numbers
+from llm import call_llm, stream_llm
+from context import fit_context
+from executor import ToolExecutor
+from perf import span, tracer
+from serialize import serialize_result
+
+SYSTEM_PROMPT = (
+    "You are a finance assistant. "
+    "If you need calculations, call one of the available functions."
+)
+
+# How many model passes a question may use:
+#   "refine"   – tool selection, post-tool answer, then a refinement pass (3 calls)
+#   "merged"   – tool selection, then one pass that answers *and* explains (2 calls)
+#   "template" – tool selection, then scalar / list results are rendered with
+#                deterministic templates (1 call); other results fall back to "merged"
+ANSWER_MODES = ("refine", "merged", "template")
+
+# Deterministic phrasing per tool; {value} (or each field of a dict result) is pre-formatted,
+# other fields are the call arguments
+ANSWER_TEMPLATES = {
+    "calculate_profit_for_instrument": "Your realised profit/loss on **{instrument}** is **{value}**.",
+    "get_max_transaction": "Your best-performing instrument is **{instrument}**, with a realised profit/loss of **{pnl}**.",
+    "calculate_ach_transactions_sum": "Your ACH transfers total **{value}**.",
+    "calculate_exp_loss_percentage": "Options that expired worthless account for **{value}** of your total buys.",
+    "risk_management_advice": "Here is some risk management advice based on your trade log:\n\n{value}",
+    "get_monthly_pnl": "Your realised profit/loss for **{month}** is **{value}**.",
+}
+PERCENT_TOOLS = {"calculate_exp_loss_percentage"}
+
+
+def _format_money(value):
+    return f"-${abs(value):,.2f}" if value < 0 else f"${value:,.2f}"
+
+
+def render_template(fn_name, args, result):
+    """Deterministic answer for a scalar, list or flat dict tool result, or None if it needs the model."""
+    template = ANSWER_TEMPLATES.get(fn_name)
+    if template is None:
+        return None
+    fields, value = {}, None
+    if isinstance(result, dict):
+        for key, item in result.items():
+            if isinstance(item, numbers.Real) and not isinstance(item, bool):
+                if math.isnan(item):
+                    return None
+                item = _format_money(item)
+            elif not isinstance(item, str):   # None (e.g. no instruments) or a nested value
+                return None
+            fields[key] = item
+    elif isinstance(result, (list, tuple)):
+        value = "\n".join(f"- {item}" for item in result)
+    elif isinstance(result, numbers.Real) and not isinstance(result, bool) and not math.isnan(result):
+        value = f"{result:.2f}%" if fn_name in PERCENT_TOOLS else _format_money(result)
+    else:
+        return None
+    try:
+        answer = template.format(**({"value": value} | args | fields))
+    except KeyError:
+        return None
+    if args.get("account"):
+        answer += f" _(account: {args['account']})_"
+    return answer
+
+
+def _extract_value(content):
+    # Pick the computed value out of a JSON-mode reply ({"value": ...} or first field)
+    try:
+        content_data = json.loads(content)
+        if isinstance(content_data, dict) and content_data:
+            if content_data.get("value"):
+                value = content_data["value"]
+                if isinstance(value, list):
+                    value = "\n".join([str(item) for item in value])
+            else:
+                value = next(iter(content_data.values()))
+        else:
+            value = content
+    except (json.JSONDecodeError, TypeError):
+        value = content
+    return value
+
+
+def _extract_final(content):
+    # The explanation pass answers with a small JSON object; show its text field
+    try:
+        final_msg = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return content
+    if not isinstance(final_msg, dict) or not final_msg:
+        return str(final_msg)
+    if "answer" in final_msg:
+        final_msg = final_msg["answer"]
+    elif len(final_msg) > 1:
+        final_msg = list(final_msg.values())[1]
+    else:
+        final_msg = list(final_msg.values())[0]
+    if isinstance(final_msg, list):
+        final_msg = "\n".join([str(item) for item in final_msg])
+    return final_msg
+
+
+def answer_question(question, chat, function_defs, tools_schema, mode="template", on_text=None,
+                    context_budget=None, executor=None, router=None, serialize=serialize_result, **llm_kwargs):
+    """Run one user question through the model / tool loop, appending to `chat`.
+
+    With `on_text`, passes that can produce the answer are streamed and
+    `on_text(partial_answer)` is called as tokens arrive. With `context_budget`,
+    each model call sees `chat` trimmed to that many prompt tokens (see
+    context.fit_context); `chat` itself keeps the full history. Tool calls of
+    one turn run concurrently on `executor` (a ToolExecutor over
+    `function_defs` is created if none is given). With an IntentRouter,
+    questions it resolves confidently skip the tool-selection model pass.
+    Tool results enter the prompt as `serialize(result)` text.
+    Returns (answer_markdown, stats) where stats reports the mode used, the
+    number of model calls the question cost, the prompt size of each call,
+    the serialized size of each tool result and, when streaming, the time
+    until the first answer text was shown. The stats are also recorded as a
+    "question" timing span; model and tool spans share its trace id.
+    """
+    if mode not in ANSWER_MODES:
+        raise ValueError(f"unknown answer mode {mode!r}; expected one of {ANSWER_MODES}")
+    with tracer.trace() as trace_id, span("question", mode=mode) as stats:
+        stats.update(trace=trace_id, model_calls=0, tool_calls=0, templated=False, routed=False, prompts=[], results=[])
+        started = time.perf_counter()
+
+        def emit(text):
+            if text:
+                stats.setdefault("first_token_s", time.perf_counter() - started)
+                on_text(text)
+
+        def llm(tools=None, stream=True):
+            stats["model_calls"] += 1
+            messages, prompt = fit_context(chat, context_budget, tools=tools)
+            stats["prompts"].append(prompt)
+            if not (on_text and stream):
+                return call_llm(messages, tools=tools, **llm_kwargs)
+            return stream_llm(messages, tools=tools, on_text=emit, **llm_kwargs)
+
+        chat.append({"role": "user", "content": question})
+
+        # ── deterministic routing, else first model pass: answer directly or pick tools
+        calls = None
+        if router is not None:
+            with span("route") as route_span:
+                calls = router.route(question)
+                route_span["routed"] = bool(calls)
+        if calls:
+            stats["routed"] = True
+            assistant = {"role": "assistant", "content": None}
+        else:
+            assistant = llm(tools_schema)
+            if assistant.get("content") and not assistant.get("tool_calls"):
+                assistant["display"] = False
+                chat.append(assistant)
+
+            calls = []
+            if "tool_calls" in assistant:
+                calls = [(c["name"], c["arguments"], c["id"]) for c in assistant["tool_calls"]]
+            elif "function_call" in assistant:   # legacy 0613 function_call support
+                calls = [(assistant["function_call"]["name"], assistant["function_call"]["arguments"], None)]
+
+        executor = executor or ToolExecutor(function_defs)
+        results = []
+        for call in executor.run(calls):
+            results.append((call["name"], call["args"], call["result"]))
+            stats["tool_calls"] += 1
+            stats.setdefault("tool_seconds", {})[call["name"]] = call["seconds"]
+
+            if call["call_id"]:
+                message = {"role": "tool", "name": call["name"], "tool_call_id": call["call_id"]}
+            else:
+                message = {"role": "function", "name": call["name"]}
+            serialize_started = time.perf_counter()
+            content = serialize(call["result"])
+            stats["results"].append({
+                "name": call["name"],
+                "bytes": len(content.encode()),
+                "seconds": time.perf_counter() - serialize_started,
+            })
+            chat.append(message | {"content": content, "display": False})
+
+        # ── deterministic rendering: no further model passes
+        if mode == "template" and results:
+            rendered = [render_template(*r) for r in results]
+            if all(rendered):
+                answer = "\n\n".join(rendered)
+                if on_text:
+                    emit(answer)
+                chat.append({"role": "assistant", "content": answer, "display": False})
+                stats["templated"] = True
+                return answer, stats
+
+        if not calls and mode != "refine":
+            return str(_extract_value(assistant["content"])), stats
+
+        if mode in ("merged", "template"):
+            # ── one pass that both answers from the tool results and explains them
+            chat.append({
+                "role": "user",
+                "content": (
+                    f"Using the function results above, answer the question '{question}' "
+                    f"and explain the result clearly and helpfully. "
+                    f'Reply as JSON: {{"answer": "<explanation>"}}.'
+                ),
+                "display": False,
+                "synthetic": True,
+            })
+            assistant = llm()
+            assistant["display"] = False
+            chat.append(assistant)
+            return str(_extract_final(assistant["content"])), stats
+
+        # ── "refine": final-answer pass, then a refinement pass over the extracted value
+        if calls:
+            assistant = llm(stream=False)
+            assistant["display"] = False
+            chat.append(assistant)
+
+        value = _extract_value(assistant["content"])
+        refinement_prompt = (
+            f"The user asked: '{question}'\n"
+            f"The computed result was:\n{value}\n\n"
+            f"Please explain the result clearly and helpfully."
+        )
+        chat.append({"role": "user", "content": refinement_prompt, "synthetic": True})
+        refined_response = llm()
+        chat.append(refined_response)
+        return str(_extract_final(refined_response["content"])), stats
@@ -0,0 +1,187 @@
+import calendar
+import difflib
+import json
+import re
+import time
+
+# Single-intent rules: tool name -> question pattern
+INTENT_RULES = {
+    "calculate_ach_transactions_sum": re.compile(r"\bach\b|\bdeposit(?:s|ed)?\b|\bwithdrawals?\b|\btransfers?\b", re.I),
+    "calculate_exp_loss_percentage": re.compile(r"\bexpir\w*|\bworthless\b|\boexp\b", re.I),
+    "risk_management_advice": re.compile(r"\brisk\w*|\badvi[cs]e\b|\bstop[- ]loss\b", re.I),
+    "get_max_transaction": re.compile(r"\b(?:best|biggest|largest|max(?:imum)?|top|most profitable)\b", re.I),
+}
+PNL_PATTERN = re.compile(
+    r"\bp\s?&\s?l\b|\bpnl\b|\bp/l\b|\bprofit\w*|\bloss(?:es)?\b|\bmade\b|\bmake\b|\bearn\w*|\blost\b|\blose\b"
+    r"|\bgain\w*|\breturns?\b|\bperformance\b|\bhow much\b|\bdo on\b|\bdid on\b",
+    re.I,
+)
+# The max tool ranks gains only: superlatives about losses, deposits etc. go to the model
+NOT_A_GAIN = re.compile(r"\blos(?:s|ses|t|e|ing)\b|\bworst\b|\bdrawdowns?\b|\bdeposit\w*|\bwithdraw\w*", re.I)
+# The expiration tool reports a loss share; "which options expire next week" is not about that
+EXPIRATION_LOSS = re.compile(
+    r"\blos(?:s|ses|t|e|ing)\b|\bworthless\b|\boexp\b|\bpercent\w*|%|\bshare\b|\bcost\w*|\bwasted?\b", re.I
+)
+# Questions that need reasoning or comparison rather than a single lookup, or a count no tool returns
+NEEDS_MODEL = re.compile(
+    r"\bwhy\b|\bcompare\w*|\bversus\b|\bvs\.?\b|\bbetter\b|\bworse\b|\bpredict\w*|\bforecast\w*"
+    r"|\bhow many\b|\bnumber of\b|\bhow often\b|\bcount\b",
+    re.I,
+)
+# Time qualifiers left over once a "YYYY-MM" / "March 2024" month is taken out: the tools are all-time
+# or per month, so "in 2024", "last month", "ytd" or a month without a year cannot be answered by rules
+TIME_QUALIFIER = re.compile(
+    r"\b(?:19|20)\d\d\b|\bytd\b|\byear[- ]to[- ]date\b|\b(?:day|week|month|quarter|year)s?\b|\b(?:daily|weekly|monthly|yearly)\b"
+    r"|\bannual\w*|\bq[1-4]\b|\btoday\b|\byesterday\b|\brecent\w*|\bsince\b"
+    r"|\b(?:january|february|march|april|june|july|august|september|october|november|december)\b",
+    re.I,
+)
+
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS |= {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+ISO_MONTH = re.compile(r"\b(20\d\d)[-/](0?[1-9]|1[0-2])\b")
+NAMED_MONTH = re.compile(r"\b(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?,?\s+(20\d\d)\b", re.I)
+TOKEN = re.compile(r"[A-Za-z][A-Za-z0-9.\-/]*[A-Za-z0-9]|[A-Za-z]")
+
+# Words never treated as tickers (case-insensitive), even if a ticker of that name was traded
+STOPWORDS = set("""
+a about account accounts ach advice advise after all also am an and any are as at be been before best big
+biggest by can deposit deposits did do does done earn earned earning earnings expiration expirations expire
+expired for from gain gains get give go had has have how i if in into is it its largest last loss losses lost
+lose made make many max maximum me money month monthly much my net of on options or our out overall p pnl
+performance profit profits return returns risk show sum tell than that the their them this to top total trade
+trades trading transfer transfers was we were what when where which who will with withdrawal withdrawals
+worthless year you your now today so far ever just there here please
+""".split()) | set(_MONTHS)
+
+
+def parse_month(question):
+    """'YYYY-MM' for the first month mentioned with a year, or None."""
+    match = ISO_MONTH.search(question)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}"
+    match = NAMED_MONTH.search(question)
+    if match:
+        return f"{match.group(2)}-{_MONTHS[match.group(1).lower()]:02d}"
+    return None
+
+
+class IntentRouter:
+    """Resolve common questions to tool calls without a model pass.
+
+    Keyword / pattern rules pick the tool(s); instruments are matched against
+    the loaded symbols, exactly or with difflib fuzzy matching above
+    `cutoff`; an uploaded account name in the question becomes the `account`
+    argument. `route()` returns None whenever anything is ambiguous, leaving
+    the question to the model. `stats` accumulates hit rate and latency and
+    may be shared across router instances (e.g. per session).
+    """
+
+    def __init__(self, instruments, accounts=(), cutoff=0.8, stats=None):
+        self.instruments = {str(i).casefold(): str(i) for i in instruments}
+        self.accounts = list(accounts)
+        self.cutoff = cutoff
+        self.stats = stats if stats is not None else new_router_stats()
+
+    @classmethod
+    def for_handler(cls, handler, **kwargs):
+        """Router over the instruments (and accounts, for a Portfolio) of a trade data handler."""
+        return cls(handler.summary.totals["pnl"], getattr(handler, "accounts", ()), **kwargs)
+
+    def match_instruments(self, question):
+        """[(instrument, score), ...] mentioned in the question, in order of appearance."""
+        found = {}
+        for token in TOKEN.findall(question):
+            key = token.casefold()
+            if key in STOPWORDS and not (token.isupper() and len(token) > 1):
+                continue
+            if key in self.instruments:
+                found.setdefault(self.instruments[key], 1.0)
+            elif len(token) >= 3 and key not in STOPWORDS:
+                close = difflib.get_close_matches(key, self.instruments, n=1, cutoff=self.cutoff)
+                if close:
+                    score = difflib.SequenceMatcher(None, key, close[0]).ratio()
+                    found.setdefault(self.instruments[close[0]], score)
+        return list(found.items())
+
+    def _account_pattern(self, name):
+        # Whole-word match on the file name or its stem ("ira.csv" / "ira")
+        stem = name.rsplit(".", 1)[0]
+        return re.compile(rf"(?<!\w)(?:{re.escape(name)}|{re.escape(stem)})(?!\w)", re.I)
+
+    def match_account(self, question):
+        """The one account named in the question, None if none, False if several."""
+        hits = {name for name in self.accounts if self._account_pattern(name).search(question)}
+        return hits.pop() if len(hits) == 1 else (None if not hits else False)
+
+    def _resolve(self, question):
+        if NEEDS_MODEL.search(question):
+            return None
+        account = self.match_account(question)
+        if account is False:   # several accounts named – let the model sort it out
+            return None
+        text = question
+        for name in self.accounts:   # account names must not be read as tickers
+            text = self._account_pattern(name).sub(" ", text)
+
+        month = parse_month(text)
+        undated = ISO_MONTH.sub(" ", NAMED_MONTH.sub(" ", text))
+        if TIME_QUALIFIER.search(undated):
+            return None
+        instruments = self.match_instruments(undated)
+        pnl = PNL_PATTERN.search(text)
+        intents = [name for name, pattern in INTENT_RULES.items() if pattern.search(text)]
+        if "calculate_exp_loss_percentage" in intents and not EXPIRATION_LOSS.search(text):
+            intents.remove("calculate_exp_loss_percentage")
+        if "get_max_transaction" in intents and (len(intents) > 1 or NOT_A_GAIN.search(text)):
+            return None   # "biggest loss", "largest deposit", "top risk": not the best instrument
+
+        if month and intents:
+            return None   # "deposits in March 2024": only PnL has a per-month tool
+        calls = []
+        if month:
+            calls += [("get_monthly_pnl", {"month": month, "instrument": i}) for i, _ in instruments] or [
+                ("get_monthly_pnl", {"month": month})
+            ]
+        elif instruments:
+            if not pnl:
+                return None
+            calls += [("calculate_profit_for_instrument", {"instrument": i}) for i, _ in instruments]
+        for name in intents:
+            if name == "get_max_transaction" and instruments:
+                continue   # "top ... on SPY" is not the portfolio-wide max
+            if name == "calculate_exp_loss_percentage" and instruments:
+                return None   # per-symbol expiration loss has no tool
+            calls.append((name, {}))
+        if not calls:
+            return None
+        if account:
+            calls = [(name, args | {"account": account}) for name, args in calls]
+        confidence = min((score for _, score in instruments), default=1.0)
+        return calls, confidence
+
+    def route(self, question):
+        """[(tool_name, arguments_json, None), ...] for a confidently understood question, else None."""
+        started = time.perf_counter()
+        resolved = self._resolve(question)
+        routed = None
+        if resolved and resolved[1] >= self.cutoff:
+            routed = [(name, json.dumps(args), None) for name, args in resolved[0]]
+        self.stats["questions"] += 1
+        self.stats["routed"] += routed is not None
+        self.stats["seconds"] += time.perf_counter() - started
+        return routed
+
+
+def new_router_stats():
+    return {"questions": 0, "routed": 0, "seconds": 0.0}
+
+
+def router_summary(stats):
+    """Hit rate and mean routing latency (ms) from accumulated router stats."""
+    n = stats["questions"]
+    return {
+        "questions": n,
+        "hit_rate": stats["routed"] / n if n else 0.0,
+        "mean_ms": 1000 * stats["seconds"] / n if n else 0.0,
+    }
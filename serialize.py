@@ -0,0 +1,101 @@
+import json
+import math
+import numbers
+
+import numpy as np
+import pandas as pd
+
+RESULT_FORMATS = ("csv", "json", "markdown")
+
+
+def _scalar(value):
+    """JSON-friendly Python scalar with money-style rounding for floats."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else round(value, 2)
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return str(value)
+    return value
+
+
+def _encode_scalar(value):
+    value = _scalar(value)
+    if value is None:
+        return "n/a"
+    if isinstance(value, bool) or not isinstance(value, numbers.Number):
+        return str(value)
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def _cap_rows(df, max_rows):
+    """Keep the `max_rows` rows with the largest magnitude in the first numeric column.
+
+    Returns (kept_rows, omitted_count, note) where note describes the cut.
+    """
+    if len(df) <= max_rows:
+        return df, 0, ""
+    numeric = df.select_dtypes("number").columns
+    omitted = len(df) - max_rows
+    if not len(numeric):
+        return df.head(max_rows), omitted, f"… {omitted} more rows"
+    order = df[numeric[0]].abs().sort_values(ascending=False).index
+    return df.loc[order].head(max_rows), omitted, f"… {omitted} more rows (top {max_rows} of {len(df)} by |{numeric[0]}|)"
+
+
+def _encode_table(df, fmt, max_rows):
+    kept, omitted, note = _cap_rows(df, max_rows)
+    kept = kept.round(2)
+    if fmt == "json":
+        payload = {"columns": list(map(str, kept.columns)), "rows": [[_scalar(v) for v in row] for row in kept.itertuples(index=False)]}
+        if omitted:
+            payload["note"] = note
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+    if fmt == "markdown":
+        # Plain pipe table; DataFrame.to_markdown would need the optional tabulate package
+        lines = ["| " + " | ".join(map(str, kept.columns)) + " |", "|" + "---|" * len(kept.columns)]
+        lines += ["| " + " | ".join(_encode_scalar(v) for v in row) + " |" for row in kept.itertuples(index=False)]
+        text = "\n".join(lines)
+    else:
+        text = kept.to_csv(index=False, lineterminator="\n").rstrip("\n")
+    if omitted:
+        text += "\n" + note
+    return text
+
+
+def _encode_list(items, fmt, max_rows):
+    items = list(items)
+    kept, omitted = items[:max_rows], max(0, len(items) - max_rows)
+    if fmt == "json":
+        payload = [_scalar(v) for v in kept] + ([f"… {omitted} more items"] if omitted else [])
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str)
+    lines = [f"- {_encode_scalar(v)}" for v in kept]
+    if omitted:
+        lines.append(f"… {omitted} more items")
+    return "\n".join(lines)
+
+
+def serialize_result(result, fmt="csv", max_rows=20, max_chars=4000):
+    """Compact prompt text for a tool result.
+
+    Scalars are rendered as plain numbers (2 dp, "n/a" for NaN), lists as
+    bullets (or a JSON array), dicts as JSON, and Series / DataFrames as CSV,
+    JSON (columns + rows) or markdown tables. Tables longer than `max_rows`
+    keep the rows with the largest magnitude in their first numeric column
+    and note how many were left out; any text is capped at `max_chars`.
+    """
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"unknown result format {fmt!r}; expected one of {RESULT_FORMATS}")
+    if isinstance(result, pd.Series):
+        result = result.iloc[0] if len(result) == 1 else result.rename(result.name or "value").reset_index()
+    if isinstance(result, pd.DataFrame):
+        text = _encode_table(result, fmt, max_rows)
+    elif isinstance(result, dict):
+        text = json.dumps({str(k): _scalar(v) for k, v in result.items()}, separators=(",", ":"), ensure_ascii=False, default=str)
+    elif isinstance(result, (list, tuple, set, np.ndarray)):
+        text = _encode_list(result, fmt, max_rows)
+    else:
+        text = _encode_scalar(result)
+    if len(text) > max_chars:
+        text = text[:max_chars] + f"… [{len(text) - max_chars} more chars]"
+    return text
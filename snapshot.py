@@ -0,0 +1,117 @@
+import os
+import pickle
+import shutil
+import threading
+import time
+
+try:
+    import pyarrow.feather as feather
+except ImportError:   # snapshots are optional; without pyarrow every load parses CSV
+    feather = None
+
+# Bump whenever cleaning/derivation logic changes so stale snapshots are ignored
+SNAPSHOT_VERSION = 5
+
+FRAMES = ("df", "pnl_df", "exp_loss_df")
+
+
+class SnapshotStore:
+    """On-disk Arrow IPC (Feather v2) snapshots of cleaned trade logs, keyed by content hash.
+
+    Frames are written uncompressed, so a load is a fast columnar reload:
+    the file is memory-mapped (no read buffer, no parsing or re-cleaning) and
+    converted into regular pandas blocks in one copy. The returned frames are
+    ordinary in-memory DataFrames with the schema's dtypes, not views on disk.
+    Policy: a snapshot is invalid once SNAPSHOT_VERSION changes; `cleanup()`
+    removes invalid snapshots, snapshots unused for `max_age` seconds and then
+    the least recently used ones until the directory fits in `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=5 * 1024**3, max_age=30 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = feather is not None
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}-v{SNAPSHOT_VERSION}")
+
+    def load(self, key):
+        """Return {"df", "pnl_df", "exp_loss_df", "summary"} for `key`, or None."""
+        path = self._path(key)
+        if not self.enabled or not os.path.isdir(path):
+            return None
+        try:
+            # to_pandas copies the mapped columns into pandas blocks (categoricals, datetimes)
+            snap = {
+                name: feather.read_table(os.path.join(path, f"{name}.arrow"), memory_map=True).to_pandas()
+                for name in FRAMES
+            }
+            with open(os.path.join(path, "summary.pkl"), "rb") as fh:
+                snap["summary"] = pickle.load(fh)
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            self.invalidate(key)   # partial or corrupt snapshot – rebuild from CSV
+            return None
+        os.utime(path)   # mark as recently used for LRU cleanup
+        return snap
+
+    def save(self, key, dh):
+        """Write the frames and summary of a HandleTradeData under `key`."""
+        if not self.enabled or dh.df is None:
+            return
+        path = self._path(key)
+        # per thread: two sessions of one process may build the same upload at once
+        tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        os.makedirs(tmp, exist_ok=True)
+        try:
+            for name in FRAMES:
+                feather.write_feather(
+                    getattr(dh, name).reset_index(drop=True),
+                    os.path.join(tmp, f"{name}.arrow"),
+                    compression="uncompressed",
+                )
+            with open(os.path.join(tmp, "summary.pkl"), "wb") as fh:
+                pickle.dump(dh.summary, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)   # atomic publish; readers never see partial writes
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def invalidate(self, key):
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def cleanup(self):
+        """Apply the version / age / size policy. Returns the number of snapshots removed."""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        removed = 0
+        live = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            mtime = os.path.getmtime(path)
+            if ".tmp" in name and now - mtime < 3600:
+                continue   # another process may still be writing it
+            if not name.endswith(f"-v{SNAPSHOT_VERSION}") or now - mtime > self.max_age:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            else:
+                live.append((mtime, _dir_size(path), path))
+
+        total = sum(size for _, size, _ in live)
+        for _, size, path in sorted(live):   # oldest first
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+def _dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path)
+        for f in files
+    )
@@ -0,0 +1,275 @@
+"""Local stand-in for Ollama's OpenAI-compatible API, for measuring the app without a model.
+
+    python stub_server.py --port 11434 --latency 0.3 --token-delay 0.01
+    python stub_server.py --script responses.json
+
+Speaks POST /v1/chat/completions (tool_calls, legacy function_call, JSON
+mode, SSE streaming with optional usage) plus /api/chat and /api/generate.
+Without a script, a request offering tools gets a call to the tool whose
+name best matches the question; anything else gets a short JSON or text
+answer. Script rules ({"match": regex, "model": regex, "content" |
+"tool_calls" | "function_call", "latency", "once"}) override that, first
+match wins; a rule with no response keys only sets the latency, e.g.
+{"model": "nemo", "latency": 0.5} to make one model slower than another.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TICKER = re.compile(r"\b[A-Z]{2,5}\b")
+MONTH = re.compile(r"\b20\d\d-\d\d\b")
+
+
+def _last_user_text(messages):
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            return m.get("content") or ""
+    return ""
+
+
+def _pick_tool(question, functions):
+    """The function whose name shares most words with the question, with required args filled in."""
+    words = set(re.findall(r"[a-z]+", question.lower()))
+    best = max(functions, key=lambda f: len(words & set(f["name"].split("_"))))
+    args = {}
+    params = best.get("parameters", {})
+    for name in params.get("required", []):
+        if name == "month":
+            match = MONTH.search(question)
+            args[name] = match.group(0) if match else "2024-01"
+        else:
+            match = TICKER.search(question)
+            args[name] = match.group(0) if match else "SPY"
+    return best["name"], json.dumps(args)
+
+
+class StubServer:
+    """Threaded HTTP server answering chat completions from rules, with simulated latency.
+
+    `latency` (seconds, or a (low, high) range) is slept before the first
+    byte; `token_delay` between streamed chunks of `chunk_chars` characters.
+    `stats` counts requests per path and the peak number in flight.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_delay=0.0, chunk_chars=4, script=None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.chunk_chars = chunk_chars
+        self.script = list(script or [])
+        self.stats = {"requests": 0, "by_path": {}, "in_flight": 0, "peak_in_flight": 0}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ── response rules
+    def _rule_for(self, text, model=""):
+        with self._lock:
+            for i, rule in enumerate(self.script):
+                if re.search(rule.get("match", ""), text, re.I) and re.search(rule.get("model", ""), model or "", re.I):
+                    if rule.get("once"):
+                        self.script.pop(i)
+                    return rule
+        return None
+
+    def _sleep(self, rule):
+        latency = rule.get("latency", self.latency) if rule else self.latency
+        if isinstance(latency, (list, tuple)):
+            latency = random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+    def reply(self, body):
+        """(message, rule) for a chat completion request body."""
+        messages = body.get("messages") or []
+        question = _last_user_text(messages)
+        rule = self._rule_for(question, body.get("model"))
+        json_mode = (body.get("response_format") or {}).get("type") in ("json_object", "json") or body.get("format") == "json"
+        tools = [t["function"] for t in body.get("tools") or []]
+        functions = body.get("functions") or []
+        answered = messages and messages[-1].get("role") in ("tool", "function")
+
+        message = {"role": "assistant", "content": None}
+        if rule and {"content", "tool_calls", "function_call"} & rule.keys():
+            if "tool_calls" in rule:
+                message["tool_calls"] = [
+                    {"id": f"call_{next(self._ids)}", "type": "function",
+                     "function": {"name": c["name"], "arguments": json.dumps(c.get("arguments", {}))}}
+                    for c in rule["tool_calls"]
+                ]
+            elif "function_call" in rule:
+                fc = rule["function_call"]
+                message["function_call"] = {"name": fc["name"], "arguments": json.dumps(fc.get("arguments", {}))}
+            else:
+                content = rule.get("content", "")
+                message["content"] = content if isinstance(content, str) else json.dumps(content)
+        elif (tools or functions) and not answered:
+            name, arguments = _pick_tool(question, tools or functions)
+            if tools:
+                message["tool_calls"] = [{"id": f"call_{next(self._ids)}", "type": "function",
+                                          "function": {"name": name, "arguments": arguments}}]
+            else:
+                message["function_call"] = {"name": name, "arguments": arguments}
+        else:
+            result = messages[-1].get("content", "") if answered else ""
+            text = f"Stub answer to: {question[:80]}" + (f" (result: {result[:80]})" if result else "")
+            message["content"] = json.dumps({"answer": text}) if json_mode else text
+        return message, rule
+
+    def _handler_class(server):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"   # keep-alive, like Ollama
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path in ("/v1/models", "/api/tags"):
+                    self._send_json({"object": "list", "data": [], "models": []})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.stats["requests"] += 1
+                    server.stats["by_path"][self.path] = server.stats["by_path"].get(self.path, 0) + 1
+                    server.stats["in_flight"] += 1
+                    server.stats["peak_in_flight"] = max(server.stats["peak_in_flight"], server.stats["in_flight"])
+                try:
+                    if self.path == "/v1/chat/completions":
+                        self._chat_completions(body)
+                    elif self.path == "/api/chat":
+                        message, rule = server.reply(body)
+                        server._sleep(rule)
+                        # native shape: arguments are objects and calls carry no id
+                        calls = message.pop("tool_calls", None) or []
+                        if calls:
+                            message["tool_calls"] = [
+                                {"function": {"name": c["function"]["name"], "arguments": json.loads(c["function"]["arguments"])}}
+                                for c in calls
+                            ]
+                        message["content"] = message["content"] or ""
+                        self._send_json({"model": body.get("model"), "message": message, "done": True,
+                                         "prompt_eval_count": len(json.dumps(body.get("messages"))) // 4,
+                                         "eval_count": len(json.dumps(message)) // 4})
+                    elif self.path == "/api/generate":
+                        server._sleep(None)
+                        self._send_json({"model": body.get("model"), "response": "", "done": True})
+                    else:
+                        self._send_json({"error": "not found"}, 404)
+                finally:
+                    with server._lock:
+                        server.stats["in_flight"] -= 1
+
+            def _chat_completions(self, body):
+                message, rule = server.reply(body)
+                server._sleep(rule)
+                model = body.get("model", "stub")
+                prompt_tokens = len(json.dumps(body.get("messages"))) // 4
+                completion_tokens = len(json.dumps(message)) // 4
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                base = {"id": f"chatcmpl-{next(server._ids)}", "created": int(time.time()), "model": model}
+                finish = "tool_calls" if message.get("tool_calls") else "stop"
+                if not body.get("stream"):
+                    self._send_json(base | {
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                        "usage": usage,
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(delta, finish_reason=None, **extra):
+                    chunk = base | {"object": "chat.completion.chunk",
+                                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]} | extra
+                    self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+
+                event({"role": "assistant"})
+                for i, call in enumerate(message.get("tool_calls") or []):
+                    # name first, then the arguments in a second delta, as real servers do
+                    event({"tool_calls": [{"index": i, "id": call["id"], "type": "function",
+                                           "function": {"name": call["function"]["name"], "arguments": ""}}]})
+                    event({"tool_calls": [{"index": i, "function": {"arguments": call["function"]["arguments"]}}]})
+                if message.get("function_call"):
+                    event({"function_call": message["function_call"]})
+                content = message.get("content") or ""
+                for start in range(0, len(content), server.chunk_chars):
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                    event({"content": content[start:start + server.chunk_chars]})
+                event({}, finish)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self._chunk(f"data: {json.dumps(base | {'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n".encode())
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--script", help="JSON file with a list of response rules")
+    args = parser.parse_args(argv)
+
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as fh:
+            script = json.load(fh)
+    server = StubServer(args.host, args.port, latency=args.latency, token_delay=args.token_delay, script=script)
+    print(f"stub server on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
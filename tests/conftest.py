@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_trades   # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def trades_csv(tmp_path_factory):
+    """Seeded 20k-row broker CSV over 200 instruments."""
+    path = tmp_path_factory.mktemp("trades") / "trades.csv"
+    return str(generate_trades(str(path), 20_000, seed=7, instruments=200))
@@ -0,0 +1,27 @@
+import os
+import time
+
+from cache import ResponseCache
+
+
+def _age(cache, key, seconds):
+    path = cache._path(key)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_cleanup_drops_expired_then_oldest_entries(tmp_path):
+    cache = ResponseCache(ttl=3600, directory=str(tmp_path), max_bytes=None)
+    for i in range(6):
+        cache.put(f"{i:02d}key", {"answer": "x" * 1000})
+        _age(cache, f"{i:02d}key", 600 * i)   # 00key newest ... 05key 50 minutes old
+    cache.put("99expired", {"answer": "old"})
+    _age(cache, "99expired", 7200)
+
+    assert cache.cleanup() == 1
+    assert not os.path.exists(cache._path("99expired"))
+
+    cache.max_bytes = 3 * os.path.getsize(cache._path("00key"))
+    assert cache.cleanup() == 3
+    fresh = ResponseCache(ttl=3600, directory=str(tmp_path))   # disk tier only
+    assert [fresh.get(f"{i:02d}key") is not None for i in range(6)] == [True] * 3 + [False] * 3
@@ -0,0 +1,94 @@
+import inspect
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from executor import ToolExecutor
+from functions import FUNCTION_DEFS, TOOL_METHODS, ToolRegistry, default_handler
+from pipeline import render_template
+from utils import HandleTradeData, Portfolio
+
+
+@pytest.fixture(scope="module")
+def handler(trades_csv):
+    return HandleTradeData(trades_csv)
+
+
+@pytest.fixture(scope="module")
+def portfolio(trades_csv):
+    return Portfolio({"main.csv": HandleTradeData(trades_csv), "ira.csv": HandleTradeData(trades_csv)})
+
+
+@pytest.mark.parametrize("which", ["handler", "portfolio"])
+def test_advertised_parameters_are_accepted(which, request):
+    registry = ToolRegistry(request.getfixturevalue(which))
+    for tool in registry:
+        params = set(inspect.signature(tool["callback"]).parameters)
+        assert set(tool["parameters"]["properties"]) <= params, tool["name"]
+
+
+def test_account_parameter_only_for_portfolio(handler, portfolio):
+    plain, multi = ToolRegistry(handler), ToolRegistry(portfolio)
+    assert all("account" not in s["function"]["parameters"]["properties"] for s in plain.tools_schema)
+    assert all("account" in s["function"]["parameters"]["properties"] for s in multi.tools_schema)
+    assert all("account" not in f["parameters"]["properties"] for f in plain.functions_schema)
+
+    results = ToolExecutor(multi).run([("calculate_ach_transactions_sum", json.dumps({"account": "ira.csv"}), "c1")])
+    assert results[0]["error"] is None
+    assert results[0]["result"] == pytest.approx(handler.calculate_ach_transactions_sum())
+
+
+class _TaggedHandler:
+    """Every tool method returns this handler's tag, after waiting for the other sessions."""
+
+    def __init__(self, tag, barrier):
+        self.tag = tag
+        self.barrier = barrier
+
+    def __getattr__(self, name):
+        if name not in TOOL_METHODS.values():
+            raise AttributeError(name)
+
+        def method(**kwargs):
+            self.barrier.wait(timeout=5)   # all sessions call their tools at the same time
+            return self.tag
+        return method
+
+
+def test_concurrent_sessions_get_their_own_results():
+    sessions = 6
+    barrier = threading.Barrier(sessions)
+
+    def session(tag):
+        registry = ToolRegistry(_TaggedHandler(tag, barrier))
+        results = ToolExecutor(registry).run([(name, "{}", name) for name in ("get_max_transaction",
+                                                                             "calculate_ach_transactions_sum")])
+        return [r["result"] for r in results]
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(session, range(sessions)))
+    assert results == [[tag, tag] for tag in range(sessions)]
+    assert all(f["callback"] is default_handler for f in FUNCTION_DEFS)
+
+
+def test_max_transaction_names_the_instrument(handler):
+    registry = ToolRegistry(handler)
+    best = ToolExecutor(registry).run([("get_max_transaction", "{}", None)])[0]["result"]
+    pnl = handler.summary.totals["pnl"]
+    assert best == {"instrument": max(pnl, key=pnl.get), "pnl": max(pnl.values())}
+
+    answer = render_template("get_max_transaction", {}, best)
+    assert f"**{best['instrument']}**" in answer
+    assert render_template("get_max_transaction", {}, {"instrument": None, "pnl": float("nan")}) is None
+
+
+def test_portfolio_memory_counts_accounts(handler, portfolio):
+    assert portfolio.memory_usage() >= 2 * handler.memory_usage()
+
+
+@pytest.mark.parametrize("name", ["ira.csv", "IRA", " ira "])
+def test_portfolio_account_by_file_name_or_stem(portfolio, name):
+    assert portfolio.account(name) is portfolio.accounts["ira.csv"]
+    assert portfolio.calculate_ach_transactions_sum(account=name) == portfolio.accounts["ira.csv"].calculate_ach_transactions_sum()
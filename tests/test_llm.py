@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from llm import JsonTextStreamer
+
+
+def _feed(reply, size):
+    streamer = JsonTextStreamer()
+    for start in range(0, len(reply), size):
+        text = streamer.feed(reply[start:start + size])
+    return text
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_streamed_text_decodes_escapes_split_across_chunks(size):
+    reply = json.dumps({"answer": 'Line "one"\nCafé → done'}, ensure_ascii=True)
+    assert _feed(reply, size) == 'Line "one"\nCafé → done'
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_malformed_unicode_escape_is_shown_as_written(size):
+    assert _feed(r'{"answer": "bad \uZZZZ and \u12"}', size) == r"bad \uZZZZ and \u12"
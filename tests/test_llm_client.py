@@ -0,0 +1,46 @@
+import time
+
+import pytest
+
+from llm_client import AsyncLLMClient
+from stub_server import StubServer
+
+LATENCY = 0.2
+CONCURRENCY = 4
+
+
+@pytest.fixture
+def stub():
+    with StubServer(latency=LATENCY) as server:
+        yield server
+
+
+def _request(i):
+    return dict(model="stub", messages=[{"role": "user", "content": f"question {i}"}])
+
+
+def test_distinct_requests_run_concurrency_at_a_time(stub):
+    client = AsyncLLMClient(base_url=stub.url, max_concurrency=CONCURRENCY)
+    client.complete(**_request("warm-up"))   # SDK import and first connection outside the timing
+    n = 16
+
+    started = time.perf_counter()
+    futures = [client.submit(**_request(i)) for i in range(n)]
+    replies = [f.result() for f in futures]
+    elapsed = time.perf_counter() - started
+
+    expected = n / CONCURRENCY * LATENCY        # 0.8s; one at a time would take 3.2s
+    assert expected * 0.9 <= elapsed < expected * 1.75
+    assert [r.choices[0].message.content for r in replies] == [f"Stub answer to: question {i}" for i in range(n)]
+    assert stub.stats["peak_in_flight"] == CONCURRENCY
+    assert client.stats["peak_in_flight"] == CONCURRENCY
+
+
+def test_identical_concurrent_requests_reach_the_server_once(stub):
+    client = AsyncLLMClient(base_url=stub.url, max_concurrency=CONCURRENCY)
+    futures = [client.submit(**_request("same")) for _ in range(10)]
+    replies = [f.result() for f in futures]
+
+    assert stub.stats["requests"] == 1
+    assert (client.stats["requests"], client.stats["coalesced"]) == (1, 9)
+    assert len({r.choices[0].message.content for r in replies}) == 1
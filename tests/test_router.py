@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from router import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(["SPY", "TSLA", "QQQ", "AAPL"], accounts=["ira.csv"])
+
+
+@pytest.mark.parametrize("question, calls", [
+    ("What is the total of my ACH transactions?", [("calculate_ach_transactions_sum", {})]),
+    ("How much did I lose on expired options?", [("calculate_exp_loss_percentage", {})]),
+    ("What percentage of my losses came from expirations?", [("calculate_exp_loss_percentage", {})]),
+    ("Which instruments were most profitable?", [("get_max_transaction", {})]),
+    ("What was my biggest gain?", [("get_max_transaction", {})]),
+    ("What was my profit on SPY?", [("calculate_profit_for_instrument", {"instrument": "SPY"})]),
+    ("How did I do in 2024-03?", [("get_monthly_pnl", {"month": "2024-03"})]),
+    ("What was my profit on SPY in March 2024?", [("get_monthly_pnl", {"month": "2024-03", "instrument": "SPY"})]),
+    ("Give me risk advice for ira", [("risk_management_advice", {"account": "ira.csv"})]),
+    # superlatives that do not ask for the largest gain
+    ("What was my biggest loss?", None),
+    ("What is my largest deposit?", None),
+    ("Show my top risk", None),
+    ("What was my largest withdrawal?", None),
+    # time qualifiers the tools cannot apply
+    ("What was my best month?", None),
+    ("What was my best month in 2024?", None),
+    ("How much did I make on META in 2024?", None),
+    ("What's my PnL on SPY last month?", None),
+    ("What's my PnL on SPY this year?", None),
+    ("What is my YTD profit?", None),
+    ("What did I make in March?", None),
+    # a month with an intent that has no per-month tool
+    ("How much did I deposit in March 2024?", None),
+    ("What were my expiration losses in 2024-03?", None),
+    # counts
+    ("How many trades did I make on SPY?", None),
+    ("How many ACH deposits did I make?", None),
+    # expirations that are not about expiration losses
+    ("Which options expire next week?", None),
+    ("Why did I lose money on TSLA?", None),
+])
+def test_route(router, question, calls):
+    routed = router.route(question)
+    if calls is None:
+        assert routed is None
+    else:
+        assert [(name, json.loads(args)) for name, args, _ in routed] == calls
@@ -0,0 +1,34 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import snapshot   # noqa: E402
+from utils import HandleTradeData   # noqa: E402
+
+
+def test_concurrent_saves_of_one_upload_use_separate_temp_dirs(trades_csv, tmp_path, monkeypatch):
+    store = snapshot.SnapshotStore(str(tmp_path))
+    dh = HandleTradeData(trades_csv)
+    write = snapshot.feather.write_feather
+    both_writing = threading.Barrier(2, timeout=5)
+    dirs = {}
+
+    def write_feather(df, dest, **kwargs):
+        if threading.get_ident() not in dirs:   # hold both saves inside their first write
+            dirs[threading.get_ident()] = os.path.dirname(dest)
+            both_writing.wait()
+        write(df, dest, **kwargs)
+
+    monkeypatch.setattr(snapshot.feather, "write_feather", write_feather)
+    threads = [threading.Thread(target=store.save, args=("same-upload", dh)) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(dirs.values())) == 2
+    assert [name for name in os.listdir(tmp_path) if ".tmp" in name] == []
+    assert len(store.load("same-upload")["df"]) == len(dh.df)
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+import pandas as pd
+from pandas.testing import assert_frame_equal, assert_series_equal
+
+from cache import LRUCache
+from utils import HandleTradeData, append_trade_data, parse_amount
+
+
+def reference_pnl(df):
+    # Pre-vectorization implementation. Its amount parser dropped the parentheses,
+    # so it summed magnitudes; feed it |Amount| to compare like for like.
+    df = df.assign(Amount=df['Amount'].abs())
+    return df.groupby('Instrument', observed=True).apply(
+        lambda g: g[g['Trans Code'] == 'STC']['Amount'].sum() - g[g['Trans Code'] == 'BTO']['Amount'].sum()
+    ).reset_index(name='PnL')
+
+
+def test_calculate_pnl_matches_reference(trades_csv):
+    dh = HandleTradeData(trades_csv)
+    df = dh.df.copy()
+    rng = np.random.default_rng(1)
+    df.loc[rng.random(len(df)) < 0.05, 'Amount'] = np.nan
+    assert df['Instrument'].nunique() > 100
+
+    assert_frame_equal(dh.calculate_pnl(df), reference_pnl(df))
+
+
+def test_parse_amount():
+    parsed = parse_amount(pd.Series(["($1,234.00)", "$5", "", None, np.nan, "$1,000,000.50", "(7)"]))
+    expected = pd.Series([-1234.0, 5.0, np.nan, np.nan, np.nan, 1000000.5, -7.0])
+    assert_series_equal(parsed, expected)
+
+    numeric = pd.Series([1, -2, 3])
+    assert_series_equal(parse_amount(numeric), numeric.astype('float64'))
+
+
+EXPIRY_CSV = """Activity Date,Process Date,Settle Date,Instrument,Description,Trans Code,Quantity,Price,Amount
+1/2/2024,1/2/2024,1/3/2024,SPY,SPY 1/19/2024 Call $480.00,BTO,1,$2.00,($200.00)
+1/3/2024,1/3/2024,1/4/2024,SPY,SPY 1/19/2024 Call $480.00,BTO,1,$3.00,($300.00)
+1/4/2024,1/4/2024,1/5/2024,SPY,SPY 1/19/2024 Call $480.00,STC,1,$4.00,$400.00
+1/19/2024,1/19/2024,1/22/2024,SPY,Option Expiration for SPY 1/19/2024 Call $480.00,OEXP,1,,
+1/2/2024,1/2/2024,1/3/2024,QQQ,QQQ 1/19/2024 Put $400.00,BTO,2,$1.00,($200.00)
+1/5/2024,1/5/2024,1/8/2024,QQQ,QQQ 1/19/2024 Put $400.00,STC,2,$1.50,$300.00
+"""
+
+
+def test_expiration_loss_is_bto_cost_of_expired_contracts(tmp_path):
+    # Loss = what was paid (BTO magnitudes) for contracts with an OEXP record;
+    # sales of the same contract do not count, unexpired contracts do not count.
+    # (The original merge also summed SPY's STC row: 900, not 500.)
+    path = tmp_path / "expiry.csv"
+    path.write_text(EXPIRY_CSV)
+    dh = HandleTradeData(str(path))
+
+    assert dh.exp_loss_df.to_dict("records") == [{"Instrument": "SPY", "loss_amount": 500.0}]
+    assert dh.summary.totals['exp_loss_total'] == 500.0
+    assert dh.calculate_exp_loss_percentage() == 500.0 / 700.0 * 100
+
+
+def test_expiration_loss_summary_matches_frame(trades_csv):
+    dh = HandleTradeData(trades_csv)
+    frame = dict(zip(dh.exp_loss_df['Instrument'].astype(str), dh.exp_loss_df['loss_amount']))
+    assert frame and all(v >= 0 for v in frame.values())
+    assert frame == pytest.approx({str(k): v for k, v in dh.summary.totals['exp_loss'].items()})
+
+
+def test_append_skips_overlap_despite_different_dtypes(trades_csv, tmp_path):
+    # History has ACH rows with blank Quantity (float64); the delta has none, so
+    # its Quantity parses as int32. Overlapping rows must still be recognised.
+    lines = open(trades_csv).read().splitlines()
+    header, rows = lines[0], lines[1:]
+    history, later = rows[:15_000], [r for r in rows[15_000:] if ",ACH," not in r]
+    overlap = [r for r in history[-3_000:] if ",ACH," not in r][-1_000:]
+    new = later[:950]
+
+    (tmp_path / "history.csv").write_text("\n".join([header, *history]) + "\n")
+    (tmp_path / "delta.csv").write_text("\n".join([header, *overlap, *new]) + "\n")
+    (tmp_path / "full.csv").write_text("\n".join([header, *history, *new]) + "\n")
+
+    base = HandleTradeData(str(tmp_path / "history.csv"))
+    assert base.df['Quantity'].dtype == 'float64'
+    base_pnl = base.summary.totals['net_pnl']
+    appended = base.fork()
+    assert appended.append(str(tmp_path / "delta.csv")) == len(new)
+    assert base.summary.totals['net_pnl'] == base_pnl and len(base.df) == len(history)
+
+    full = HandleTradeData(str(tmp_path / "full.csv"))
+    assert appended.summary.totals['net_pnl'] == pytest.approx(full.summary.totals['net_pnl'])
+    assert len(appended.df) == len(full.df)
+
+    # The history's fingerprints are built once and shared by later forks
+    assert base.fork()._base_counts is appended._base_counts
+    assert appended.append(str(tmp_path / "delta.csv")) == 0
+
+
+def test_append_to_streamed_history_is_a_value_error(trades_csv, tmp_path):
+    # app.py reports ValueError per delta; anything else would break the page
+    streamed = HandleTradeData(trades_csv, chunksize=5000)
+    delta = tmp_path / "delta.csv"
+    delta.write_text(EXPIRY_CSV)
+    with pytest.raises(ValueError, match="full trade log"):
+        append_trade_data(streamed, str(delta), LRUCache())
+
+
+
+def test_monthly_pnl_normalizes_month_and_flags_unknown_keys(trades_csv):
+    dh = HandleTradeData(trades_csv)
+    instrument, month = next(k for k in dh.summary.totals['month_pnl'] if isinstance(k, tuple))
+    expected = dh.get_monthly_pnl(month)
+    assert expected != 0.0
+    year, number = month.split("-")
+    assert dh.get_monthly_pnl(f"{year}-{int(number)}") == expected
+    assert dh.get_monthly_pnl(f"{pd.Timestamp(month + '-01'):%B %Y}") == expected
+    assert dh.get_monthly_pnl(month, instrument) == dh.summary.totals['month_pnl'][(instrument, month)]
+
+    assert "Unknown month" in dh.get_monthly_pnl("last month")
+    assert "Unknown instrument" in dh.get_monthly_pnl(month, "NOPE")
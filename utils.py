@@ -1,77 +1,490 @@
+import copy
+import hashlib
+import io
+import re
+import threading
+import time
+from collections import Counter
 import pandas as pd
+from cache import content_hash
+from perf import current_trace, span, tracer
+from router import parse_month
+
+# "($1,234.00)" -> "-1234.00": '(' becomes the minus sign, '$ , ) ' are dropped
+_AMOUNT_TRANSLATION = str.maketrans('(', '-', '$,) ')
+
+
+def parse_amount(col):
+    """Parse broker amount strings ($, thousands separators, accounting-style
+    parentheses negatives, blanks) into float64: one str.translate per cell in
+    Python, then a single vectorized pd.to_numeric."""
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype('float64')
+    # one str.translate per cell; non-strings (NaN, numbers) pass through
+    text = [x.translate(_AMOUNT_TRANSLATION) if type(x) is str else x for x in col.tolist()]
+    return pd.to_numeric(pd.Series(text, index=col.index), errors='coerce').astype('float64')
+
+
+# Explicit schema applied on load; columns missing from an export are skipped
+CATEGORY_COLUMNS = ['Instrument', 'Trans Code']
+DATE_COLUMNS = ['Activity Date', 'Process Date', 'Settle Date']
+BROKER_DATE_FORMAT = '%m/%d/%Y'
+
+
+def parse_dates(col):
+    parsed = pd.to_datetime(col, format=BROKER_DATE_FORMAT, errors='coerce')
+    if parsed.isna().all() and col.notna().any():
+        parsed = pd.to_datetime(col, format='mixed', errors='coerce')   # non-broker date layout
+    return parsed
+
+
+def parse_quantity(col):
+    qty = pd.to_numeric(col, errors='coerce')
+    if qty.notna().all() and (qty % 1 == 0).all() and qty.abs().max() < 2**31:
+        return qty.astype('int32')
+    return qty.astype('float64')   # fractional shares or blanks
+
+
+# "SPY 6/21/2024 Call $540.00", optionally prefixed by "Option Expiration for"
+_CONTRACT_RE = re.compile(
+    r"^(?:Option Expiration for\s+)?(?P<root>\S+)\s+(?P<month>\d{1,2})/(?P<day>\d{1,2})/(?P<year>\d{4})"
+    r"\s+(?P<right>Call|Put)\s+\$(?P<strike>[\d,]*\.?\d+)",
+    re.IGNORECASE,
+)
+
+
+def contract_key(description):
+    """Normalized option contract key, e.g. "SPY 2024-06-21 C 540", or None."""
+    m = _CONTRACT_RE.match(description)
+    if not m:
+        return None
+    strike = float(m['strike'].replace(',', ''))
+    return (
+        f"{m['root'].upper()} {m['year']}-{int(m['month']):02d}-{int(m['day']):02d} "
+        f"{m['right'][0].upper()} {strike:g}"
+    )
+
+
+def contract_keys(descriptions):
+    """Contract key for every Description (NaN for non-option rows); each
+    distinct description is parsed only once."""
+    descriptions = descriptions.astype('category')
+    keys = {d: contract_key(str(d)) for d in descriptions.cat.categories}
+    return descriptions.map(keys).astype('category')
+
+
+def apply_schema(df):
+    # Categoricals for the low-cardinality keys so masks and groupbys run on
+    # integer codes, real datetimes for dates, numeric Quantity / Price
+    for col in CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        if col in df:
+            df[col] = parse_dates(df[col])
+    if 'Quantity' in df:
+        df['Quantity'] = parse_quantity(df['Quantity'])
+    if 'Price' in df:
+        df['Price'] = parse_amount(df['Price'])
+    if 'Description' in df:
+        df['Contract'] = contract_keys(df['Description'])
+    return df
+
+
+def concat_trades(frames):
+    # pd.concat turns categoricals with differing categories into objects; re-type them
+    df = pd.concat(frames, ignore_index=True)
+    for col in CATEGORY_COLUMNS + ['Contract']:
+        if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _canonical(col):
+    # One representation per value whatever dtype a file happened to infer:
+    # a delta without blank quantities parses Quantity as int32, history as float64
+    if pd.api.types.is_bool_dtype(col) or pd.api.types.is_numeric_dtype(col):
+        return col.astype('float64')
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col.astype('datetime64[ns]')
+    return col.astype('string')
+
+
+def row_fingerprints(df):
+    """uint64 hash of every row's cleaned values (derived columns excluded),
+    independent of the dtypes inferred for the file the row came from."""
+    df = df.drop(columns=['Contract'], errors='ignore')
+    return pd.util.hash_pandas_object(df.apply(_canonical), index=False)
+
+
+def chained_hash(base_hash, delta_hash):
+    # Identity of "history + delta", used as cache/snapshot key of the appended log
+    return hashlib.sha256(f"{base_hash}:{delta_hash}".encode()).hexdigest()
+
+
+def _accumulate(totals, series):
+    # Fold a keyed Series (e.g. a groupby result) into a running dict of totals
+    for key, value in series.items():
+        totals[key] = totals.get(key, 0) + value
+
+
+class TradeSummary:
+    """Running aggregates of a trade log that can be folded in chunk by chunk.
+
+    The core is an analytics cube of (Instrument, Trans Code, month) ->
+    [signed Amount, |Amount|, rows], plus per-contract amounts for the
+    expiration matching. Per-instrument BTO/STC sums, ACH totals and instrument
+    counts are folded from the cube. Memory is bounded by the number of
+    distinct instruments/months/contracts rather than the number of rows.
+
+    Totals that the tools need (PnL per instrument, a case-insensitive
+    instrument index, expiration losses, extremes) are derived once after the
+    last update, so every tool call is a constant-time lookup.
+    """
+
+    def __init__(self):
+        self.cube = {}                  # (instrument, trans code, "YYYY-MM") -> [amount, |amount|, rows]
+        self.stc = {}                   # instrument -> sum |Amount| of STC rows
+        self.bto = {}                   # instrument -> sum |Amount| of BTO rows
+        self.instrument_counts = {}     # instrument -> number of rows
+        self.contract_amounts = {}      # (Contract, Instrument) -> sum |Amount| of BTO rows
+        self.expired_contracts = set()  # contracts with an OEXP record
+        self.bto_total = 0.0
+        self.ach_total = 0.0
+        self.ach_count = 0
+        self._totals = None
+
+    def update(self, df):
+        """Fold a cleaned chunk of the trade log into the running totals."""
+        code = df['Trans Code']
+        amount = df['Amount']
+        oexp = code == 'OEXP'
+        dates = df['Activity Date'] if 'Activity Date' in df else pd.Series(pd.NaT, index=df.index)
+
+        grouped = pd.DataFrame({'amount': amount, 'abs_amount': amount.abs(), 'rows': 1}).groupby(
+            [df['Instrument'], code, dates.dt.year, dates.dt.month], observed=True, dropna=False,
+        ).sum()
+        for (instrument, trans_code, year, month), (amt, abs_amt, rows) in zip(grouped.index, grouped.to_numpy()):
+            key = (
+                None if pd.isna(instrument) else instrument,
+                None if pd.isna(trans_code) else trans_code,
+                None if pd.isna(year) else f"{int(year):04d}-{int(month):02d}",
+            )
+            self._fold(key, [amt, abs_amt, rows])
+
+        bto = code == 'BTO'
+        _accumulate(
+            self.contract_amounts,
+            amount[bto].abs().groupby([df['Contract'][bto], df['Instrument'][bto]], observed=True).sum(),
+        )
+        self.expired_contracts.update(df.loc[oexp, 'Contract'].dropna())
+        self._totals = None
+        return self
+
+    def _fold(self, key, values):
+        instrument, trans_code, _ = key
+        amt, abs_amt, rows = values
+        cell = self.cube.setdefault(key, [0.0, 0.0, 0])
+        cell[0] += amt
+        cell[1] += abs_amt
+        cell[2] += int(rows)
+        if instrument is not None:
+            self.instrument_counts[instrument] = self.instrument_counts.get(instrument, 0) + int(rows)
+        if trans_code == 'STC' and instrument is not None:
+            self.stc[instrument] = self.stc.get(instrument, 0.0) + abs_amt
+        elif trans_code == 'BTO':
+            self.bto_total += abs_amt
+            if instrument is not None:
+                self.bto[instrument] = self.bto.get(instrument, 0.0) + abs_amt
+        elif trans_code == 'ACH':
+            self.ach_total += amt
+            self.ach_count += int(rows)
+
+    def copy(self):
+        """Independent copy for folding in more rows. Only the cube cells are
+        mutable; the other tables map to immutable values and are copied flat."""
+        other = copy.copy(self)
+        other.cube = {key: list(cell) for key, cell in self.cube.items()}
+        for name in ('stc', 'bto', 'instrument_counts', 'contract_amounts'):
+            setattr(other, name, dict(getattr(self, name)))
+        other.expired_contracts = set(self.expired_contracts)
+        return other
+
+    @classmethod
+    def combine(cls, summaries):
+        """Merge per-account summaries ({account: TradeSummary}). Contract keys are
+        namespaced by account so an expiration in one account never matches
+        trades in another."""
+        total = cls()
+        for account, summary in summaries.items():
+            for key, values in summary.cube.items():
+                total._fold(key, values)
+            for (contract, instrument), amount in summary.contract_amounts.items():
+                total.contract_amounts[((account, contract), instrument)] = amount
+            total.expired_contracts.update((account, c) for c in summary.expired_contracts)
+        return total
+
+    @property
+    def totals(self):
+        """Lookup tables derived from the cube; rebuilt only after an update."""
+        if self._totals is None:
+            pnl = {i: self.stc.get(i, 0.0) - self.bto.get(i, 0.0) for i in sorted(self.instrument_counts)}
+            losses = {}
+            for (contract, instrument), amount in self.contract_amounts.items():
+                if contract in self.expired_contracts:
+                    losses[instrument] = losses.get(instrument, 0.0) + amount
+            month_pnl = {}
+            for (instrument, trans_code, month), (_, abs_amt, _) in self.cube.items():
+                if instrument is not None and trans_code in ('STC', 'BTO'):
+                    sign = 1 if trans_code == 'STC' else -1
+                    for key in (month, (instrument, month)):
+                        month_pnl[key] = month_pnl.get(key, 0.0) + sign * abs_amt
+            self._totals = {
+                'pnl': pnl,
+                'instrument_index': {str(i).casefold(): i for i in pnl},
+                'max_pnl': max(pnl.values(), default=float('nan')),
+                'max_instrument': max(pnl, key=pnl.get, default=None),
+                'min_pnl': min(pnl.values(), default=float('nan')),
+                'net_pnl': sum(pnl.values()),
+                'exp_loss': dict(sorted(losses.items())),
+                'exp_loss_total': sum(losses.values()),
+                'month_pnl': month_pnl,
+                'top_instruments': [i for i, n in self.instrument_counts.items() if n > 5],
+            }
+        return self._totals
+
+    def resolve_instrument(self, instrument):
+        """Canonical instrument name for a case-insensitive query, or None."""
+        return self.totals['instrument_index'].get(str(instrument).strip().casefold())
+
+    def instrument_pnl(self, instrument):
+        name = self.resolve_instrument(instrument)
+        return self.totals['pnl'][name] if name is not None else 0.0
+
+    def monthly_pnl(self, month, instrument=None):
+        """Realised PnL for a month ("2024-03", "2024-3", "March 2024"), or an error string for
+        a month or instrument that does not resolve, so it is not mistaken for a flat month."""
+        key = parse_month(str(month))
+        if key is None:
+            return f"Unknown month '{month}'; expected YYYY-MM"
+        if instrument is not None:
+            name = self.resolve_instrument(instrument)
+            if name is None:
+                return f"Unknown instrument '{instrument}'"
+            key = (name, key)
+        return self.totals['month_pnl'].get(key, 0.0)
+
+    def pnl_frame(self):
+        pnl = self.totals['pnl']
+        return pd.DataFrame({'Instrument': list(pnl), 'PnL': list(pnl.values())})
+
+    def expiration_loss_frame(self):
+        losses = self.totals['exp_loss']
+        return pd.DataFrame({'Instrument': list(losses), 'loss_amount': list(losses.values())})
+
+
+# Streamed handlers keep aggregates only, so there are no rows to de-duplicate a delta against
+APPEND_NEEDS_FULL_LOG = "appending needs the full trade log; load the history without chunksize"
+
 
 class HandleTradeData:
-    def __init__(self, file_path):
+    # Row fingerprints for append(): a Counter over the loaded history, built once and
+    # shared read-only by every fork, plus a per-handler Counter of rows appended since
+    _base_counts = None
+    _new_counts = None
+    # Class-wide: handlers are pickled to worker processes, so they hold no locks themselves
+    _df_lock = threading.Lock()
+    _counts_lock = threading.Lock()
+
+    def __init__(self, file_path, content_hash=None, chunksize=None, snapshots=None):
         self.file_path = file_path
-        self.df = self.load_trades()
-        self.df = self.df.dropna(how='all') # Drop rows with all NaN values
-        self.clean_amount_column(self.df) # Data wrangling
-        self.pnl_df = self.calculate_pnl(self.df)
-        self.exp_loss_df = self.get_expiration_loss()
+        self.content_hash = content_hash
+        with span("ingest.snapshot_load") as attrs:
+            snap = snapshots.load(content_hash) if snapshots and content_hash else None
+            attrs["hit"] = bool(snap)
+        if snap:
+            # Known file: restore the cleaned, typed frames instead of parsing CSV
+            self.df = snap["df"]
+            self.pnl_df = snap["pnl_df"]
+            self.exp_loss_df = snap["exp_loss_df"]
+            self.summary = snap["summary"]
+            return
+
+        if chunksize:
+            # Streaming mode: only the running aggregates are kept in memory
+            self.df = None
+            self.summary = TradeSummary()
+            with span("ingest.streaming", chunksize=chunksize) as attrs:
+                rows = 0
+                for chunk in self.load_trades(chunksize=chunksize):
+                    chunk = chunk.dropna(how='all')
+                    apply_schema(chunk)
+                    self.clean_amount_column(chunk)
+                    self.summary.update(chunk)
+                    rows += len(chunk)
+                attrs["rows"] = rows
+            self.pnl_df = self.summary.pnl_frame()
+            self.exp_loss_df = self.summary.expiration_loss_frame()
+            return
+
+        with span("ingest.load_trades") as attrs:
+            self.df = self.load_trades()
+            attrs["rows"] = len(self.df)
+        with span("ingest.apply_schema"):
+            self.df = self.df.dropna(how='all') # Drop rows with all NaN values
+            apply_schema(self.df) # Compact dtypes
+        with span("ingest.clean_amount_column"):
+            self.clean_amount_column(self.df) # Data wrangling
+        with span("ingest.summary"):
+            self.summary = TradeSummary().update(self.df)
+        with span("ingest.calculate_pnl"):
+            self.pnl_df = self.calculate_pnl(self.df)
+        with span("ingest.get_expiration_loss"):
+            self.exp_loss_df = self.get_expiration_loss()
+        if snapshots and content_hash:
+            with span("ingest.snapshot_save"):
+                snapshots.save(content_hash, self)
+
+    @property
+    def df(self):
+        # Appended deltas are concatenated lazily, only when the full log is read;
+        # cached handlers are shared by sessions, so only one reader concatenates
+        if self._pending:
+            with self._df_lock:
+                if self._pending:
+                    self._df = concat_trades([self._df, *self._pending])
+                    self._pending = []
+        return self._df
 
-    def load_trades(self):
-        return pd.read_csv(self.file_path)
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._pending = []
+
+    def load_trades(self, chunksize=None):
+        return pd.read_csv(self.file_path, chunksize=chunksize)
+
+    def memory_usage(self):
+        # Approximate bytes held by the trade log and its derived frames
+        frames = (self._df, *self._pending, self.pnl_df, self.exp_loss_df)
+        return int(sum(f.memory_usage(deep=True).sum() for f in frames if f is not None))
+
+    def _fingerprint_counts(self):
+        """(history_counts, appended_counts); the history Counter is built on first use only."""
+        if self._base_counts is None:
+            with self._counts_lock:
+                if self._base_counts is None:
+                    self._base_counts = Counter(row_fingerprints(self.df).tolist())
+                    self._new_counts = Counter()
+        return self._base_counts, self._new_counts
+
+    def fork(self):
+        """Independent handler sharing this one's (read-only) frames, safe to append() to.
+
+        The history's row fingerprints are built here once and shared, so an
+        append on the fork costs time proportional to the delta only.
+        """
+        if self._df is None:
+            raise ValueError(APPEND_NEEDS_FULL_LOG)
+        base_counts, new_counts = self._fingerprint_counts()
+        other = copy.copy(self)
+        other.summary = self.summary.copy()
+        other._pending = list(self._pending)
+        other._base_counts = base_counts
+        other._new_counts = Counter(new_counts)
+        return other
+
+    def append(self, delta_file):
+        """Fold a delta CSV of new activity into this handler.
+
+        Rows already ingested are skipped (by row fingerprint, respecting how
+        many identical rows history holds). The summary, pnl_df and exp_loss_df
+        are updated from the new rows only. Returns the number of rows added.
+        """
+        if self._df is None:
+            raise ValueError(APPEND_NEEDS_FULL_LOG)
+        base_counts, new_counts = self._fingerprint_counts()
+
+        delta = pd.read_csv(delta_file).dropna(how='all')
+        apply_schema(delta)
+        self.clean_amount_column(delta)
+
+        keep = []
+        seen = Counter()
+        hashes = row_fingerprints(delta).tolist()
+        for h in hashes:
+            seen[h] += 1
+            keep.append(seen[h] > base_counts[h] + new_counts[h])
+        delta = delta[keep]
+        new_counts.update(h for h, k in zip(hashes, keep) if k)
+
+        self.content_hash = chained_hash(self.content_hash, content_hash(delta_file))
+        if delta.empty:
+            return 0
+        self._pending.append(delta)
+        self.summary.update(delta)
+        self.pnl_df = self.summary.pnl_frame()
+        self.exp_loss_df = self.summary.expiration_loss_frame()
+        return len(delta)
 
     def clean_amount_column(self, df):
         # Clean and convert Amount to float
-        df['Amount'] = df['Amount'].replace('[\$,()]', '', regex=True).replace(',', '', regex=True)
-        df['Amount'] = df['Amount'].apply(lambda x: f"-{x}" if '(' in str(x) else x)
-        df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+        df['Amount'] = parse_amount(df['Amount'])
         return df.copy()
 
     def calculate_pnl(self, df):
         
-        # Calculate PnL per instrument
-        pnl = df.groupby('Instrument').apply(
-            lambda g: g[g['Trans Code'] == 'STC']['Amount'].sum() - g[g['Trans Code'] == 'BTO']['Amount'].sum()
-        ).reset_index(name='PnL')
+        # Calculate PnL per instrument in a single grouped pass:
+        # split Amount into STC / BTO columns, sum both per instrument, subtract.
+        # Magnitudes are used since BTO debits are parsed as negative amounts.
+        totals = df[['Instrument']].assign(
+            STC=df['Amount'].abs().where(df['Trans Code'] == 'STC'),
+            BTO=df['Amount'].abs().where(df['Trans Code'] == 'BTO'),
+        ).groupby('Instrument', observed=True)[['STC', 'BTO']].sum()
+        pnl = (totals['STC'] - totals['BTO']).reset_index(name='PnL')
 
         self.pnl_df = pnl
         return pnl
 
     def get_amount_for_instrument(self, instrument):
-
-        print("Instrument: " + instrument)
-        instrument_pnl = self.pnl_df[self.pnl_df['Instrument'] == instrument]
-        if instrument_pnl.empty:
-            return 0.0
-        return instrument_pnl['PnL']
+        return self.summary.instrument_pnl(instrument)
 
     def get_max_amount_for_instrument(self):
-        return self.pnl_df['PnL'].max()
+        totals = self.summary.totals
+        return {'instrument': totals['max_instrument'], 'pnl': totals['max_pnl']}
 
-    def calculate_ach_transactions_sum(self):
+    def get_monthly_pnl(self, month, instrument=None):
+        return self.summary.monthly_pnl(month, instrument)
 
-        ach_transactions = self.df[self.df['Trans Code'] == 'ACH']
-        return ach_transactions['Amount'].sum()
+    def calculate_ach_transactions_sum(self):
+        return self.summary.ach_total
     
     def get_expiration_loss(self):
-    
-        oexp_records = self.df[self.df["Trans Code"] == "OEXP"].copy()
-        
-        oexp_records["MatchedDescription"] = oexp_records["Description"].str.extract(r"Option Expiration for\s+(.+)$")
-        
-        merged_df = self.df.merge(
-            oexp_records[["MatchedDescription"]],
-            left_on="Description",
-            right_on="MatchedDescription",
-            how="inner"
-        )
-        
-        merged_df_cleaned = self.clean_amount_column(merged_df)
-        
-        merged_df_cleaned["Amount"] = pd.to_numeric(merged_df_cleaned["Amount"], errors="coerce")
-        oexp_df = merged_df.groupby("Instrument", as_index=False)["Amount"].sum()
+        # Premium lost to expirations: the BTO cost (a positive magnitude) of every
+        # contract that has an OEXP record; sales of the same contract do not offset it.
+        # This deliberately changes the original metric, which summed the BTO *and* STC
+        # rows of expired contracts (once per OEXP lot), so sales before expiry counted
+        # as expiration loss
+
+        # Contracts with an OEXP record; each counts once even if expired in several lots
+        code = self.df["Trans Code"]
+        expired = self.df.loc[code == "OEXP", "Contract"].dropna().unique()
+
+        # Hashed lookup of every BTO row's contract key against the expired set
+        matched = self.df[(code == "BTO") & self.df["Contract"].isin(expired)]
+        oexp_df = matched.assign(Amount=matched["Amount"].abs()).groupby(
+            "Instrument", as_index=False, observed=True
+        )["Amount"].sum()
         oexp_df = oexp_df.rename(columns={"Amount": "loss_amount"})
 
         return oexp_df
     
     def calculate_exp_loss_percentage(self):
         # Calculate the percentage of expiration loss
-        total_bto_amount = self.df[self.df['Trans Code'] == 'BTO']['Amount'].sum()
+        total_bto_amount = self.summary.bto_total
         if total_bto_amount == 0:
             return 0.0
-        exp_loss = self.exp_loss_df["loss_amount"].sum()
+        exp_loss = self.summary.totals['exp_loss_total']
         return (exp_loss / total_bto_amount) * 100 if total_bto_amount != 0 else 0.0
 
 
@@ -84,25 +497,170 @@ class HandleTradeData:
             advice.append("Reduce option positions held until expiration; consider setting exit rules to avoid full premium loss.")
 
         # 2. Max loss vs. max gain
-        max_pnl = self.pnl_df['PnL'].max()
-        min_pnl = self.pnl_df['PnL'].min()
+        max_pnl = self.summary.totals['max_pnl']
+        min_pnl = self.summary.totals['min_pnl']
         if abs(min_pnl) > max_pnl:
             advice.append("Your largest loss is greater than your largest gain. Use stop-losses or reduce position size to protect capital.")
 
         # 3. Concentration in few instruments
-        instrument_counts = self.df['Instrument'].value_counts()
-        top_instruments = instrument_counts[instrument_counts > 5]
+        top_instruments = self.summary.totals['top_instruments']
         if len(top_instruments) == 1:
-            advice.append(f"You are trading mostly in {top_instruments.index[0]}. Diversify across instruments to spread risk.")
+            advice.append(f"You are trading mostly in {top_instruments[0]}. Diversify across instruments to spread risk.")
 
         # 4. High ACH deposit frequency
-        ach_count = len(self.df[self.df['Trans Code'] == 'ACH'])
+        ach_count = self.summary.ach_count
         if ach_count > 3:
             advice.append("Frequent ACH deposits suggest you may be replenishing a losing account. Review position sizing and avoid revenge trading.")
 
         # 5. Net PnL
-        net_pnl = self.pnl_df['PnL'].sum()
+        net_pnl = self.summary.totals['net_pnl']
         if net_pnl < 0:
             advice.append("Your portfolio shows an overall loss. Re-evaluate your strategy and limit downside exposure per trade.")
 
         return advice if advice else ["Your risk appears reasonably managed. Continue monitoring for consistency and discipline."]
+
+
+class Portfolio(HandleTradeData):
+    """Several brokerage accounts behind the HandleTradeData tool interface.
+
+    Tools answer across all accounts from a combined summary, or for a single
+    account when called with `account=<name>`.
+    """
+
+    def __init__(self, accounts):
+        self.accounts = accounts   # account name -> HandleTradeData
+        self.file_path = None
+        self.content_hash = hashlib.sha256(
+            ":".join(f"{name}={dh.content_hash}" for name, dh in sorted(accounts.items())).encode()
+        ).hexdigest()
+        self.df = None   # raw logs stay per account; see self.accounts[name].df
+        self.summary = TradeSummary.combine({name: dh.summary for name, dh in accounts.items()})
+        self.pnl_df = self.summary.pnl_frame()
+        self.exp_loss_df = self.summary.expiration_loss_frame()
+
+    def memory_usage(self):
+        # The cached portfolio keeps every account alive, even after the cache evicts their own entries
+        return HandleTradeData.memory_usage(self) + sum(dh.memory_usage() for dh in self.accounts.values())
+
+    def account(self, name):
+        """Handler for one account (case-insensitive file name or stem, as the router matches it),
+        or the whole portfolio for None / "all"."""
+        if name is None or name.strip().lower() in ("", "all"):
+            return self
+        wanted = name.strip().lower()
+        for account_name, dh in self.accounts.items():
+            if wanted in (account_name.lower(), account_name.rsplit(".", 1)[0].lower()):
+                return dh
+        raise KeyError(name)
+
+    def _scoped(self, method, account, *args):
+        try:
+            handler = self.account(account)
+        except KeyError:
+            return f"Unknown account '{account}'. Available accounts: {', '.join(self.accounts)}"
+        if handler is self:
+            return getattr(HandleTradeData, method)(self, *args)
+        return getattr(handler, method)(*args)
+
+    def get_amount_for_instrument(self, instrument, account=None):
+        return self._scoped('get_amount_for_instrument', account, instrument)
+
+    def get_max_amount_for_instrument(self, account=None):
+        return self._scoped('get_max_amount_for_instrument', account)
+
+    def get_monthly_pnl(self, month, instrument=None, account=None):
+        return self._scoped('get_monthly_pnl', account, month, instrument)
+
+    def calculate_ach_transactions_sum(self, account=None):
+        return self._scoped('calculate_ach_transactions_sum', account)
+
+    def calculate_exp_loss_percentage(self, account=None):
+        return self._scoped('calculate_exp_loss_percentage', account)
+
+    def risk_management_advice(self, account=None):
+        return self._scoped('risk_management_advice', account)
+
+
+def _ingest_account(name, data, chunksize, snapshots):
+    # Worker-process entry point: parse and clean one account's CSV bytes;
+    # the worker's timing spans are returned so the parent can record them
+    with tracer.capture() as spans:
+        dh = HandleTradeData(io.BytesIO(data), content_hash=content_hash(data), chunksize=chunksize, snapshots=snapshots)
+    dh.file_path = name
+    return dh, spans
+
+
+def load_trade_data(upload, cache, chunksize=None, snapshots=None):
+    """Return a HandleTradeData for `upload`, reusing `cache` when the same bytes were seen before
+    and the on-disk `snapshots` store when they were seen by an earlier process."""
+    key = content_hash(upload)
+    return cache.get_or_create(
+        key,
+        lambda: HandleTradeData(upload, content_hash=key, chunksize=chunksize, snapshots=snapshots),
+    )
+
+
+def append_trade_data(dh, delta, cache):
+    """Return a cached handler for `dh` plus the new rows of `delta`; `dh` itself is not modified."""
+    def build():
+        appended = dh.fork()
+        appended.append(delta)
+        return appended
+
+    return cache.get_or_create(chained_hash(dh.content_hash, content_hash(delta)), build)
+
+
+def load_accounts(uploads, cache, executor=None, snapshots=None, chunksize=None, streaming_threshold=0):
+    """Return a Portfolio over several account CSVs (one per upload, named by file name).
+
+    Uploads not already in `cache` are parsed and cleaned in parallel on
+    `executor` (a ProcessPoolExecutor); uploads larger than
+    `streaming_threshold` bytes are ingested in chunks of `chunksize` rows.
+    """
+    keys = {u.name: content_hash(u) for u in uploads}
+    sizes = {u.name: len(u.getvalue()) for u in uploads}
+    chunks = {name: chunksize if chunksize and size > streaming_threshold else None for name, size in sizes.items()}
+
+    accounts = {name: cache.get(key) for name, key in keys.items()}
+    missing = [u for u in uploads if accounts[u.name] is None]
+    if executor is not None and len(missing) > 1:
+        futures = {
+            u.name: executor.submit(_ingest_account, u.name, u.getvalue(), chunks[u.name], snapshots)
+            for u in missing
+        }
+        for name, future in futures.items():
+            dh, spans = future.result()
+            tracer.record(*(r | {"trace": current_trace(), "account": name} for r in spans))
+            accounts[name] = cache.put(keys[name], dh)
+    else:
+        for u in missing:
+            accounts[u.name] = load_trade_data(u, cache, chunksize=chunks[u.name], snapshots=snapshots)
+
+    return cache.get_or_create(
+        "portfolio:" + ":".join(f"{name}={key}" for name, key in sorted(keys.items())),
+        lambda: Portfolio(accounts),
+    )
+
+
+def schema_report(file_path):
+    """Compare the raw CSV frame with the typed schema: bytes per column and
+    the cost of a `Trans Code == 'BTO'` mask on each."""
+    raw = pd.read_csv(file_path).dropna(how='all')
+    typed = apply_schema(raw.copy())
+    typed['Amount'] = parse_amount(typed['Amount'])
+
+    def mask_seconds(df, repeat=20):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            df['Trans Code'] == 'BTO'
+        return (time.perf_counter() - start) / repeat
+
+    report = pd.DataFrame({
+        'raw_dtype': raw.dtypes.astype(str),
+        'raw_bytes': raw.memory_usage(deep=True, index=False),
+        'typed_dtype': typed.dtypes.astype(str),
+        'typed_bytes': typed.memory_usage(deep=True, index=False),
+    })
+    report.loc['TOTAL', ['raw_bytes', 'typed_bytes']] = report[['raw_bytes', 'typed_bytes']].sum()
+    report.loc['BTO mask (seconds)', ['raw_bytes', 'typed_bytes']] = [mask_seconds(raw), mask_seconds(typed)]
+    return report
@@ -0,0 +1,156 @@
+"""Model preload / keep-alive and cold-start measurement.
+
+    python warmup.py                  # load the model now and keep it resident
+    python warmup.py --measure        # report import, model-load and first-answer times
+
+Only the standard library is imported at module level, so app.py can start
+a warm-up before it pays for pandas or the OpenAI SDK.
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Modules the chat app needs once files are uploaded; imported in the background meanwhile
+APP_MODULES = ("pandas", "openai", "utils", "pipeline", "functions", "router", "serialize")
+
+
+def preload(model=None, keep_alive="30m"):
+    """Ask Ollama to load `model` and keep it resident for `keep_alive` (-1: until it stops).
+
+    An empty /api/generate request loads the weights without generating.
+    Returns {"seconds", "load_s"}; load_s is Ollama's own load_duration
+    (≈0 when the model was already resident).
+    """
+    from llm import MODEL
+    from llm_client import shared_client
+
+    started = time.perf_counter()
+    reply = shared_client().native("/api/generate", {"model": model or MODEL, "keep_alive": keep_alive})
+    return {"seconds": time.perf_counter() - started, "load_s": reply.get("load_duration", 0) / 1e9}
+
+
+class ModelWarmup:
+    """Background start-up work for one app process.
+
+    A daemon thread imports APP_MODULES, preloads `models` (default
+    llm.MODEL) with `keep_alive`, then re-sends the preload every `refresh` seconds: plain
+    chat requests reset Ollama's unload timer to its server default, which
+    would otherwise drop the model a few idle minutes after the last answer.
+    `timings` collects the start-up measurements shown in the app.
+    """
+
+    def __init__(self, models=None, keep_alive="30m", refresh=240, modules=APP_MODULES):
+        self.models = list(models or [None])
+        self.keep_alive = keep_alive
+        self.refresh = refresh
+        self.modules = modules
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.error = None
+        self.ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            t = time.perf_counter()
+            for name in self.modules:
+                importlib.import_module(name)
+            self.timings["imports_s"] = time.perf_counter() - t
+            loaded = [preload(model, self.keep_alive) for model in self.models]
+            self.timings |= {"model_ready_s": sum(l["seconds"] for l in loaded),
+                             "model_load_s": sum(l["load_s"] for l in loaded)}
+        except Exception as exc:   # Ollama not up yet: the first question will load the model instead
+            self.error = f"{type(exc).__name__}: {exc}"
+        finally:
+            self.ready.set()
+
+        from perf import tracer
+        tracer.record(*[
+            {"trace": None, "span": f"startup.{name[:-2]}", "start": time.time(), "seconds": value}
+            for name, value in self.timings.items()
+        ])
+        while self.refresh:
+            time.sleep(self.refresh)
+            try:
+                for model in self.models:
+                    preload(model, self.keep_alive)
+            except Exception:
+                pass
+
+    def answered(self):
+        """Note the first answer of this process (seconds since the warm-up began)."""
+        self.timings.setdefault("first_answer_s", time.perf_counter() - self.started)
+
+    def status(self):
+        if not self.ready.is_set():
+            return "Warming up the model…"
+        if self.error:
+            return f"Model warm-up failed ({self.error})"
+        return "Model ready in {model_ready_s:.1f}s (load {model_load_s:.1f}s, imports {imports_s:.1f}s)".format(**self.timings)
+
+
+# ───────────────────── cold-start measurement ─────────────────────
+def _import_seconds(modules):
+    """Wall time of importing `modules` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import " + ", ".join(modules) + "; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure(model=None, keep_alive="30m", unload=True):
+    """Cold vs warm numbers for imports, model load and a first tool-selection call."""
+    from functions import TOOLS_SCHEMA
+    from llm import MODEL, call_llm
+    from llm_client import shared_client
+
+    model = model or MODEL
+    report = {
+        "import_streamlit_s": _import_seconds(["streamlit"]),
+        "import_app_modules_s": _import_seconds(APP_MODULES),
+    }
+    question = [{"role": "user", "content": "What is the total of my ACH transactions?"}]
+    if unload:   # keep_alive 0 evicts the model, so the next request is a true cold start
+        shared_client().native("/api/generate", {"model": model, "keep_alive": 0})
+        t = time.perf_counter()
+        call_llm(question, tools=TOOLS_SCHEMA)
+        report["first_answer_cold_s"] = time.perf_counter() - t
+        shared_client().native("/api/generate", {"model": model, "keep_alive": 0})
+    cold = preload(model, keep_alive)
+    report |= {"preload_s": cold["seconds"], "model_load_s": cold["load_s"],
+               "preload_resident_s": preload(model, keep_alive)["seconds"]}
+    t = time.perf_counter()
+    call_llm(question, tools=TOOLS_SCHEMA)
+    report["first_answer_warm_s"] = time.perf_counter() - t
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="model to load (default: llm.MODEL)")
+    parser.add_argument("--keep-alive", default=os.environ.get("OLLAMA_KEEP_ALIVE", "30m"),
+                        help='how long Ollama keeps the model loaded ("30m", "2h", -1 = forever)')
+    parser.add_argument("--measure", action="store_true", help="report cold-start and first-answer latency")
+    parser.add_argument("--no-unload", action="store_true", help="with --measure: skip the cold (evicted) runs")
+    args = parser.parse_args(argv)
+    keep_alive = int(args.keep_alive) if args.keep_alive.lstrip("-").isdigit() else args.keep_alive
+
+    if args.measure:
+        print(json.dumps(measure(args.model, keep_alive, unload=not args.no_unload), indent=2))
+    else:
+        loaded = preload(args.model, keep_alive)
+        print(f"model ready in {loaded['seconds']:.2f}s (load {loaded['load_s']:.2f}s, keep_alive {keep_alive})")
+
+
+if __name__ == "__main__":
+    main()